@@ -0,0 +1,223 @@
+"""
+Index approximatif des plus proches voisins (IVF) écrit avec NumPy
+
+Les encodages sont répartis en `nlist` listes par un k-means grossier.
+Une recherche ne parcourt que les `nprobe` listes les plus proches de la
+requête : augmenter nprobe améliore le rappel au prix de la latence.
+En dessous de `exact_threshold` vecteurs, l'index fait une recherche
+exacte (plus rapide et sans perte pour les petites galeries).
+
+Comme FaceGallery, un index publié n'est jamais modifié : `with_faces` et
+`without` retournent une copie modifiée (les listes non touchées sont
+partagées), que l'appelant publie par une simple affectation.
+"""
+
+import numpy as np
+
+
+def _sq_distances(queries, vectors, vector_sq_norms=None):
+    """Distances euclidiennes au carré (Q, N)"""
+    if vector_sq_norms is None:
+        vector_sq_norms = np.einsum("ij,ij->i", vectors, vectors)
+    q_norms = np.einsum("ij,ij->i", queries, queries)
+    sq = q_norms[:, np.newaxis] + vector_sq_norms[np.newaxis, :] - 2.0 * (queries @ vectors.T)
+    return np.maximum(sq, 0, out=sq)
+
+
+def _top_k(sq, ids, k):
+    """Sélectionne les k meilleurs candidats d'une ligne de distances"""
+    k_eff = min(k, len(ids))
+    out_ids = np.full(k, -1, dtype=np.int64)
+    out_dist = np.full(k, np.inf, dtype=np.float32)
+    if k_eff == 0:
+        return out_ids, out_dist
+    idx = np.argpartition(sq, k_eff - 1)[:k_eff] if k_eff < len(ids) else np.arange(len(ids))
+    idx = idx[np.argsort(sq[idx])]
+    out_ids[:k_eff] = ids[idx]
+    out_dist[:k_eff] = np.sqrt(sq[idx])
+    return out_ids, out_dist
+
+
+class IVFIndex:
+    def __init__(self, nlist=None, nprobe=8, exact_threshold=2000, kmeans_iters=10, seed=0):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.exact_threshold = exact_threshold
+        self.kmeans_iters = kmeans_iters
+        self.seed = seed
+        self.reset()
+
+    def reset(self):
+        self.dim = None
+        self.centroids = None
+        self._lists = []          # [(ids int64 (n,), vecteurs float32 (n, D), normes² (n,))]
+        self._list_of = {}        # id → numéro de liste
+        self._flat_ids = np.empty(0, dtype=np.int64)
+        self._flat = None
+
+    def __len__(self):
+        return len(self._list_of) if self.is_trained else len(self._flat_ids)
+
+    @property
+    def is_trained(self):
+        return self.centroids is not None
+
+    def empty_like(self):
+        """Index vide avec les mêmes paramètres"""
+        return IVFIndex(self.nlist, self.nprobe, self.exact_threshold, self.kmeans_iters, self.seed)
+
+    def copy(self):
+        """Copie superficielle : les tableaux (jamais modifiés sur place) sont partagés"""
+        index = self.empty_like()
+        index.dim = self.dim
+        index.centroids = self.centroids
+        index._lists = list(self._lists)
+        index._list_of = dict(self._list_of)
+        index._flat_ids, index._flat = self._flat_ids, self._flat
+        return index
+
+    # === CONSTRUCTION ===
+    def build(self, vectors, ids):
+        """(Re)construit l'index à partir de tous les encodages (sur un index non encore publié)"""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        ids = np.asarray(ids, dtype=np.int64)
+        self.reset()
+        if len(ids) == 0:
+            return
+        self.dim = vectors.shape[1]
+
+        if len(ids) < self.exact_threshold:
+            self._flat_ids, self._flat = ids.copy(), vectors.copy()
+            return
+
+        self._train(vectors)
+        self._assign(vectors, ids)
+
+    def _train(self, vectors):
+        """k-means grossier (échantillonné) pour les centroïdes des listes"""
+        rng = np.random.default_rng(self.seed)
+        n = len(vectors)
+        nlist = self.nlist or max(1, int(np.sqrt(n)))
+        nlist = min(nlist, n)
+
+        sample = vectors[rng.choice(n, size=min(n, nlist * 64), replace=False)]
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+
+        for _ in range(self.kmeans_iters):
+            assign = _sq_distances(sample, centroids).argmin(axis=1)
+            counts = np.bincount(assign, minlength=nlist)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            nonempty = counts > 0
+            centroids[nonempty] = sums[nonempty] / counts[nonempty, np.newaxis]
+
+        self.centroids = centroids
+        self._lists = [
+            (np.empty(0, dtype=np.int64), np.empty((0, self.dim), dtype=np.float32), np.empty(0, dtype=np.float32))
+            for _ in range(nlist)
+        ]
+
+    def _assign(self, vectors, ids):
+        """Range des vecteurs dans la liste de leur centroïde le plus proche"""
+        lists = _sq_distances(vectors, self.centroids).argmin(axis=1)
+        for list_no in np.unique(lists):
+            mask = lists == list_no
+            old_ids, old_vecs, old_norms = self._lists[list_no]
+            new_vecs = vectors[mask]
+            self._lists[list_no] = (
+                np.concatenate([old_ids, ids[mask]]),
+                np.concatenate([old_vecs, new_vecs]),
+                np.concatenate([old_norms, np.einsum("ij,ij->i", new_vecs, new_vecs)]),
+            )
+            for sid in ids[mask]:
+                self._list_of[int(sid)] = int(list_no)
+
+    # === MISES À JOUR INCRÉMENTALES ===
+    def with_faces(self, vectors, ids):
+        """Nouvel index avec ces encodages ajoutés (ou remplacés), l'original est inchangé"""
+        index = self.copy()
+        index.add(vectors, ids)
+        return index
+
+    def without(self, ids):
+        """Nouvel index sans ces identifiants, l'original est inchangé"""
+        index = self.copy()
+        index.remove(ids)
+        return index
+
+    def add(self, vectors, ids):
+        """Ajoute (ou remplace) des encodages sans reconstruire l'index"""
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        ids = np.atleast_1d(np.asarray(ids, dtype=np.int64))
+        if len(ids) == 0:
+            return
+        if self.dim is None:
+            self.dim = vectors.shape[1]
+        elif vectors.shape[1] != self.dim:
+            raise ValueError(f"Dimension {vectors.shape[1]} incompatible avec l'index ({self.dim})")
+
+        self.remove(ids)
+
+        if self.is_trained:
+            self._assign(vectors, ids)
+            return
+
+        flat = vectors if self._flat is None else np.concatenate([self._flat, vectors])
+        flat_ids = np.concatenate([self._flat_ids, ids])
+        if len(flat_ids) >= self.exact_threshold:
+            # La galerie a dépassé le seuil : passage en mode IVF
+            self.build(flat, flat_ids)
+        else:
+            self._flat, self._flat_ids = flat, flat_ids
+
+    def remove(self, ids):
+        """Supprime des encodages par identifiant (les ids absents sont ignorés)"""
+        ids = np.atleast_1d(np.asarray(ids, dtype=np.int64))
+        if not self.is_trained:
+            if self._flat is not None and len(ids):
+                keep = ~np.isin(self._flat_ids, ids)
+                self._flat, self._flat_ids = self._flat[keep], self._flat_ids[keep]
+            return
+
+        touched = {self._list_of.pop(int(sid)) for sid in ids if int(sid) in self._list_of}
+        for list_no in touched:
+            list_ids, vecs, norms = self._lists[list_no]
+            keep = ~np.isin(list_ids, ids)
+            self._lists[list_no] = (list_ids[keep], vecs[keep], norms[keep])
+
+    # === RECHERCHE ===
+    def search(self, queries, k=1, nprobe=None):
+        """Retourne (ids, distances) de shape (Q, k), complétés par -1 / inf"""
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        n_queries = queries.shape[0]
+        out_ids = np.full((n_queries, k), -1, dtype=np.int64)
+        out_dist = np.full((n_queries, k), np.inf, dtype=np.float32)
+        if len(self) == 0 or n_queries == 0:
+            return out_ids, out_dist
+
+        if not self.is_trained:
+            sq = _sq_distances(queries, self._flat)
+            for q in range(n_queries):
+                out_ids[q], out_dist[q] = _top_k(sq[q], self._flat_ids, k)
+            return out_ids, out_dist
+
+        nprobe = min(nprobe or self.nprobe, len(self._lists))
+        coarse = _sq_distances(queries, self.centroids)
+        probes = np.argpartition(coarse, nprobe - 1, axis=1)[:, :nprobe]
+
+        for q in range(n_queries):
+            chosen = [self._lists[i] for i in probes[q] if len(self._lists[i][0])]
+            if not chosen:
+                continue
+            ids = np.concatenate([c[0] for c in chosen])
+            vecs = np.concatenate([c[1] for c in chosen])
+            norms = np.concatenate([c[2] for c in chosen])
+            sq = _sq_distances(queries[q:q + 1], vecs, norms)[0]
+            out_ids[q], out_dist[q] = _top_k(sq, ids, k)
+
+        return out_ids, out_dist
+
+    def estimate_recall(self, queries, exact_ids, nprobe=None):
+        """Rappel@1 de l'index par rapport à des résultats exacts connus"""
+        ids, _ = self.search(queries, k=1, nprobe=nprobe)
+        return float(np.mean(ids[:, 0] == np.asarray(exact_ids)))
@@ -0,0 +1,70 @@
+"""
+Accès non bloquant à la base pour les endpoints async de l'API
+
+Les méthodes d'AttendanceDatabase restent synchrones ; cette couche les
+exécute dans des threads dédiés à la base au lieu du threadpool de
+FastAPI, que les requêtes lentes ne peuvent donc plus épuiser :
+- lectures : plusieurs threads, chacun avec sa connexion persistante
+  (WAL autorise les lectures concurrentes) ;
+- écritures : un seul thread, SQLite n'acceptant qu'un écrivain à la
+  fois (les écritures sont sérialisées au lieu d'attendre busy_timeout).
+"""
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AsyncAttendanceDatabase:
+    def __init__(self, database, read_workers=4):
+        self.database = database
+        self._readers = ThreadPoolExecutor(max_workers=read_workers, thread_name_prefix="db-read")
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-write")
+
+    async def run(self, fn, *args, write=False, **kwargs):
+        """Exécute fn(*args, **kwargs) dans le thread de lecture ou d'écriture"""
+        executor = self._writer if write else self._readers
+        return await asyncio.get_running_loop().run_in_executor(executor, functools.partial(fn, *args, **kwargs))
+
+    def close(self):
+        self._readers.shutdown(wait=True)
+        self._writer.shutdown(wait=True)
+        self.database.close()
+
+    # === LECTURES ===
+    async def get_all_students(self):
+        return await self.run(self.database.get_all_students)
+
+    async def get_all_professors(self):
+        return await self.run(self.database.get_all_professors)
+
+    async def get_session(self, session_id):
+        return await self.run(self.database.get_session, session_id)
+
+    async def get_session_stats(self, session_id):
+        return await self.run(self.database.get_session_stats, session_id)
+
+    async def get_session_attendance(self, session_id):
+        return await self.run(self.database.get_session_attendance, session_id)
+
+    # === ÉCRITURES ===
+    async def add_professor(self, first_name, last_name, subject):
+        return await self.run(self.database.add_professor, first_name, last_name, subject, write=True)
+
+    async def delete_professor(self, professor_id):
+        return await self.run(self.database.delete_professor, professor_id, write=True)
+
+    async def delete_student(self, student_id):
+        return await self.run(self.database.delete_student, student_id, write=True)
+
+    async def create_session(self, professor_id, subject):
+        return await self.run(self.database.create_session, professor_id, subject, write=True)
+
+    async def end_session(self, session_id):
+        return await self.run(self.database.end_session, session_id, write=True)
+
+    async def mark_attendance(self, session_id, student_id):
+        return await self.run(self.database.mark_attendance, session_id, student_id, write=True)
+
+    async def mark_attendance_batch(self, session_id, records):
+        return await self.run(self.database.mark_attendance_batch, session_id, records, write=True)
@@ -0,0 +1,282 @@
+"""
+Pipeline de la boucle de présence en étapes indépendantes
+
+    capture ──(dernière image)──► reconnaissance ──(tampon)──► persistance
+        └──────────────────────► affichage (optionnel)
+
+- La capture lit la caméra en continu et ne garde que l'image la plus
+  récente : une étape lente ne crée jamais de retard dans le tampon caméra.
+- La reconnaissance traite la dernière image disponible (une image sur
+  `detect_every`) et publie les visages suivis pour l'affichage.
+- La persistance écrit les présences en base par lots, hors de la boucle
+  vidéo (attendance_recorder.AttendanceRecorder).
+- L'affichage tourne dans le thread appelant (contrainte cv2.imshow).
+
+Chaque étape expose son débit (FPS) et la profondeur de sa file.
+"""
+
+import os
+import threading
+import time
+
+import cv2
+
+from attendance_recorder import AttendanceRecorder
+from face_tracker import FaceTracker
+
+
+class StageStats:
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.started_at = time.perf_counter()
+        self._window_start = self.started_at
+        self._window_count = 0
+        self.fps = 0.0
+
+    def tick(self, n=1):
+        self.count += n
+        self._window_count += n
+        now = time.perf_counter()
+        elapsed = now - self._window_start
+        if elapsed >= 1.0:
+            self.fps = self._window_count / elapsed
+            self._window_start, self._window_count = now, 0
+
+    def as_dict(self):
+        now = time.perf_counter()
+        elapsed = now - self.started_at
+        fps = self.fps
+        if now - self._window_start >= 2.0:
+            fps = self._window_count / (now - self._window_start)  # étape au ralenti ou arrêtée
+        return {
+            "count": self.count,
+            "fps": round(fps, 1),
+            "avg_fps": round(self.count / elapsed, 1) if elapsed > 0 else 0.0,
+        }
+
+
+class LatestFrameCapture(threading.Thread):
+    """Lit la caméra en continu et ne conserve que la dernière image
+
+    Pour un fichier vidéo, `pace_fps` cale la lecture sur sa cadence
+    d'origine (sinon le fichier entier serait lu en quelques secondes).
+    """
+
+    def __init__(self, cap, stop_event, pace_fps=None):
+        super().__init__(daemon=True, name="capture")
+        self.cap = cap
+        self.stop_event = stop_event
+        self.pace_fps = pace_fps
+        self.ended = False
+        self.stats = StageStats("capture")
+        self.dropped = 0
+        self.failed = False
+        self._frame = None
+        self._seq = 0
+        self._consumed_seq = 0
+        self._cond = threading.Condition()
+
+    def run(self):
+        next_at = time.perf_counter()
+        while not self.stop_event.is_set():
+            if self.pace_fps:
+                next_at += 1.0 / self.pace_fps
+                delay = next_at - time.perf_counter()
+                if delay > 0:
+                    self.stop_event.wait(delay)
+            ret, frame = self.cap.read()
+            if not ret:
+                if self.pace_fps and self.stats.count:
+                    print("ℹ️ Fin du fichier vidéo")
+                    self.ended = True
+                else:
+                    print("✗ Erreur lecture de la source vidéo")
+                    self.failed = True
+                self.stop_event.set()
+                break
+            with self._cond:
+                if self._seq > self._consumed_seq:
+                    self.dropped += 1  # image précédente jamais lue
+                self._frame = frame
+                self._seq += 1
+                self._cond.notify_all()
+            self.stats.tick()
+
+        with self._cond:
+            self._cond.notify_all()
+
+    def read(self, after_seq=0, timeout=0.5):
+        """Retourne (seq, image) plus récente que after_seq, ou (after_seq, None)"""
+        with self._cond:
+            if self._seq <= after_seq:
+                self._cond.wait_for(lambda: self._seq > after_seq or self.stop_event.is_set(), timeout)
+            if self._seq <= after_seq:
+                return after_seq, None
+            self._consumed_seq = self._seq
+            return self._seq, self._frame
+
+    # Chaque image lue est un tableau neuf, jamais réécrit sur place
+    zero_copy = False
+
+    def is_current(self, seq):
+        return True
+
+    @property
+    def queue_depth(self):
+        return 1 if self._seq > self._consumed_seq else 0
+
+
+class AttendancePipeline:
+    def __init__(self, detector, database, session_id, source=0, display=True, detect_every=5,
+                 frame_source=None, recorder_options=None):
+        self.detector = detector
+        self.database = database
+        self.session_id = session_id
+        self.source = source
+        self.frame_source = frame_source
+        self.display = display
+        self.detect_every = detect_every
+
+        self.stop_event = threading.Event()
+        self.recorder = AttendanceRecorder(database, session_id, on_commit=self._on_commit,
+                                           **(recorder_options or {}))
+        self.tracker = FaceTracker(**detector.tracker_options) if detector.track_faces else None
+        self.capture = None
+        self.latest_faces = []
+        self.stale_frames = 0
+
+        self.recognition_stats = StageStats("recognition")
+        self.persistence_stats = StageStats("persistence")
+        self.display_stats = StageStats("display")
+
+    # === ÉTAPES ===
+    def _recognition_worker(self):
+        # Avec les trackers OpenCV, les images intermédiaires servent à suivre les visages
+        follow = self.tracker is not None and self.tracker.use_cv_trackers
+        stride = 1 if follow else self.detect_every
+        last_seq = last_detect_seq = 0
+        while not self.stop_event.is_set():
+            seq, frame = self.capture.read(last_seq + stride - 1)
+            if frame is None:
+                continue
+            last_seq = seq
+
+            if self.capture.zero_copy:
+                # Vue dans l'anneau partagé : copie, puis vérification qu'elle n'a pas été écrasée
+                # pendant la copie ; la suite (tracker compris) ne travaille que sur la copie
+                frame = frame.copy()
+                if not self.capture.is_current(seq):
+                    self.stale_frames += 1
+                    continue
+
+            if follow and last_detect_seq and seq - last_detect_seq < self.detect_every:
+                self.tracker.predict(frame)
+                self.latest_faces = self.tracker.faces()
+                continue
+            last_detect_seq = seq
+
+            if self.tracker is not None:
+                faces = self.detector._track_and_recognize(self.tracker, frame)
+            else:
+                faces = self.detector.detect_faces_in_frame(frame, return_all_faces=True)
+            self.latest_faces = faces
+            self.recognition_stats.tick()
+
+            for face in faces:
+                self.recorder.record(face["student"], face.get("confidence"))
+
+    def _on_commit(self, marked):
+        """Appelé par l'enregistreur après chaque transaction réussie"""
+        for student, confidence in marked:
+            self.detector.marked_students.add(student["id"])
+            print(f"✓ {student['name']} marqué présent ({confidence}%)")
+        self.persistence_stats.tick(len(marked))
+
+    def _display_loop(self):
+        last_seq = 0
+        while not self.stop_event.is_set() and self.detector.running:
+            seq, frame = self.capture.read(last_seq)
+            if frame is None:
+                continue
+            last_seq = seq
+
+            frame = frame.copy()
+            if not self.capture.is_current(seq):
+                continue
+            display = self.detector.draw_faces_on_frame(frame, self.latest_faces)
+
+            # Affichage des informations
+            cv2.putText(display, f"Session: {self.session_id}", (10, 30),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+            cv2.putText(display, f"Presents: {len(self.detector.marked_students)}", (10, 70),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 2)
+
+            cv2.imshow("Presence Faciale", display)
+            self.display_stats.tick()
+
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                print("✓ Arrêt demandé par l'utilisateur")
+                break
+
+    # === CYCLE DE VIE ===
+    def run(self):
+        """Ouvre la caméra (ou la source fournie), lance les étapes et bloque jusqu'à l'arrêt"""
+        cap = None
+        workers = []
+        if self.frame_source is not None:
+            # Images produites par un autre processus (ex: frame_bus.RingFrameSource)
+            self.capture = self.frame_source
+            self.capture.stop_event = self.stop_event
+        else:
+            cap = cv2.VideoCapture(self.source)
+            if not cap.isOpened():
+                print(f"✗ Source vidéo inaccessible : {self.source}")
+                return False
+            # Fichier local : lecture à la cadence de la vidéo (caméras et flux réseau imposent la leur)
+            pace_fps = None
+            if isinstance(self.source, str) and os.path.isfile(self.source):
+                pace_fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+            self.capture = LatestFrameCapture(cap, self.stop_event, pace_fps=pace_fps)
+            workers.append(self.capture)
+
+        workers.append(threading.Thread(target=self._recognition_worker, daemon=True, name="recognition"))
+        self.recorder.start()
+        for worker in workers:
+            worker.start()
+
+        try:
+            if self.display:
+                self._display_loop()
+            else:
+                while not self.stop_event.is_set() and self.detector.running:
+                    self.stop_event.wait(0.2)
+        finally:
+            self.stop_event.set()
+            for worker in workers:
+                worker.join(timeout=5)
+            self.recorder.stop()  # vide le tampon après la dernière reconnaissance
+            if cap is not None:
+                cap.release()
+            if self.display:
+                cv2.destroyAllWindows()
+        return True
+
+    def stop(self):
+        self.stop_event.set()
+
+    def stats(self):
+        """Débit par étape et profondeur des files"""
+        stats = {
+            "recognition": {**self.recognition_stats.as_dict(), "stale_frames": self.stale_frames},
+            "persistence": {**self.persistence_stats.as_dict(), **self.recorder.stats()},
+        }
+        if self.capture is not None:
+            stats["capture"] = {
+                **self.capture.stats.as_dict(),
+                "queue_depth": self.capture.queue_depth,
+                "dropped_frames": self.capture.dropped,
+            }
+        if self.display:
+            stats["display"] = self.display_stats.as_dict()
+        return stats
@@ -0,0 +1,186 @@
+"""
+Enregistrement différé (write-behind) des présences
+
+La reconnaissance appelle `record()`, qui ne touche jamais le disque :
+l'étudiant est dédoublonné en mémoire puis mis en tampon avec son heure
+d'arrivée. Un thread d'écriture vide le tampon en une seule transaction
+toutes les `flush_interval` secondes ou dès que `batch_size` présences
+sont en attente. `stop()` garantit un dernier vidage.
+
+Avec un `event_bus`, chaque vidage réussi publie les présences
+réellement insérées (pas celles d'étudiants déjà présents en base) et
+les compteurs de la séance (flux SSE de l'API).
+"""
+
+import threading
+import time
+from datetime import datetime
+
+
+class AttendanceRecorder:
+    def __init__(self, database, session_id, batch_size=32, flush_interval=0.5, on_commit=None,
+                 event_bus=None):
+        self.database = database
+        self.session_id = session_id
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.on_commit = on_commit  # appelé avec la liste des (étudiant, confiance) enregistrés
+        self.event_bus = event_bus
+
+        self.marked = set()        # présences confirmées en base
+        self._seen = set()         # présences déjà en tampon ou en base (dédoublonnage)
+        self._pending = []         # [(étudiant, confiance, heure d'arrivée)]
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._thread = None
+
+        self.flushes = 0
+        self.recorded = 0
+        self.failed_flushes = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._flush_seconds = 0.0
+
+    # === CÔTÉ RECONNAISSANCE ===
+    def record(self, student, confidence=None):
+        """Met une présence en tampon ; False si l'étudiant est déjà connu (non bloquant)"""
+        sid = student.get("id", -1)
+        if sid == -1:
+            return False
+        check_in = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        with self._cond:
+            if sid in self._seen:
+                return False
+            self._seen.add(sid)
+            self._pending.append((student, confidence, check_in))
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify()
+        return True
+
+    # === THREAD D'ÉCRITURE ===
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True, name="attendance-recorder")
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._stopping and len(self._pending) < self.batch_size:
+                    self._cond.wait(self.flush_interval)
+                stopping = self._stopping
+            if not self.flush() and self._pending and not stopping:
+                time.sleep(self.flush_interval)  # échec d'écriture : réessayer plus tard
+            if stopping:
+                return
+
+    def flush(self):
+        """Écrit toutes les présences en tampon en une transaction, retourne le nombre écrit"""
+        with self._cond:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return 0
+
+        start = time.perf_counter()
+        inserted = self.database.mark_attendance_batch(
+            self.session_id, [(student["id"], check_in) for student, _, check_in in batch]
+        )
+        elapsed = time.perf_counter() - start
+
+        if inserted is None:
+            # Remettre en tête du tampon pour le prochain vidage
+            self.failed_flushes += 1
+            with self._cond:
+                self._pending[:0] = batch
+            return 0
+
+        self.flushes += 1
+        self.recorded += len(batch)
+        self._flush_seconds += elapsed
+        self.last_flush_ms = elapsed * 1000
+        self.max_flush_ms = max(self.max_flush_ms, self.last_flush_ms)
+        self.marked.update(student["id"] for student, _, _ in batch)
+        if self.on_commit is not None:
+            self.on_commit([(student, confidence) for student, confidence, _ in batch])
+        if self.event_bus is not None and inserted:
+            # L'heure publiée est celle de la ligne insérée ; un doublon garde l'heure d'origine
+            self.event_bus.publish_checkins(
+                self.database, self.session_id, [record for record in batch if record[0]["id"] in inserted]
+            )
+        return len(batch)
+
+    def stop(self, timeout=5):
+        """Arrête le thread après un dernier vidage ; retourne le nombre de présences perdues"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        else:
+            self.flush()
+        if self._pending:
+            print(f"✗ {len(self._pending)} présence(s) non enregistrée(s)")
+        return len(self._pending)
+
+    # === STATISTIQUES ===
+    @property
+    def queue_depth(self):
+        return len(self._pending)
+
+    def stats(self):
+        return {
+            "queue_depth": self.queue_depth,
+            "recorded": self.recorded,
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+            "avg_flush_ms": round(self._flush_seconds / self.flushes * 1000, 2) if self.flushes else 0.0,
+            "max_flush_ms": round(self.max_flush_ms, 2),
+        }
+
+
+class RecorderRegistry:
+    """Un AttendanceRecorder par séance, partagé par tous les flux de la séance.
+
+    Le recorder démarre au premier acquire() et s'arrête (dernier vidage)
+    quand le dernier utilisateur appelle release().
+    """
+
+    def __init__(self, database, **recorder_options):
+        self.database = database
+        self.recorder_options = recorder_options
+        self._recorders = {}  # session_id -> [recorder, nombre d'utilisateurs]
+        self._lock = threading.Lock()
+
+    def acquire(self, session_id):
+        with self._lock:
+            entry = self._recorders.get(session_id)
+            if entry is None:
+                recorder = AttendanceRecorder(self.database, session_id, **self.recorder_options).start()
+                entry = self._recorders[session_id] = [recorder, 0]
+            entry[1] += 1
+            return entry[0]
+
+    def release(self, session_id):
+        """Libère le recorder ; retourne le nombre de présences perdues à l'arrêt (0 s'il reste utilisé)"""
+        with self._lock:
+            entry = self._recorders.get(session_id)
+            if entry is None:
+                return 0
+            entry[1] -= 1
+            if entry[1] > 0:
+                return 0
+            del self._recorders[session_id]
+        return entry[0].stop()
+
+    def get(self, session_id):
+        with self._lock:
+            entry = self._recorders.get(session_id)
+            return entry[0] if entry else None
+
+    def stop_all(self):
+        with self._lock:
+            recorders = [entry[0] for entry in self._recorders.values()]
+            self._recorders.clear()
+        for recorder in recorders:
+            recorder.stop()
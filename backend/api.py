@@ -4,19 +4,30 @@ FastAPI REST API pour le système de gestion de présence
 par reconnaissance faciale
 """
 
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form
+from fastapi import FastAPI, HTTPException, Header, UploadFile, File, Form, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
+from urllib.parse import quote
+from datetime import datetime
+import asyncio
 import os
+import time
+import zipfile
 import numpy as np
 import cv2
-import sqlite3
 
 
+from async_database import AsyncAttendanceDatabase
+from attendance_recorder import RecorderRegistry
+from event_bus import EventBus
 from database import AttendanceDatabase
+from enrollment import BulkEnroller, collect_images
 from face_detector import FaceDetector
+from frame_stream import FrameStream
+from recognition_pool import RecognitionPool
+from session_manager import SessionManager, parse_video_source
 
 # --- Initialisation FastAPI ---
 app = FastAPI(
@@ -35,7 +46,27 @@ app.add_middleware(
 
 # --- Base de données et détecteur ---
 database = AttendanceDatabase()
-detector = FaceDetector(tolerance=0.6)  # Tolérance plus stricte
+# Endpoints async : la base est interrogée dans ses propres threads, pas dans le threadpool de FastAPI
+async_db = AsyncAttendanceDatabase(database)
+# Tolérance plus stricte ; galerie rouverte depuis un instantané mmap quand la base n'a pas changé
+detector = FaceDetector(tolerance=0.6, gallery_snapshot=os.path.splitext(database.db_name)[0] + ".gallery")
+
+# Reconnaissance à la demande : pool de threads dédié, admission bornée (429 si saturé) ;
+# OpenCV limité à cpu_count // workers threads internes pour tout le processus
+recognition_pool = RecognitionPool(detector, detector_options={"tolerance": 0.6})
+
+# Événements de présence par séance (flux SSE), publiés par les enregistreurs de présences
+event_bus = EventBus()
+
+# Flux WebSocket : un enregistreur de présences par séance, partagé par ses flux
+recorders = RecorderRegistry(database, event_bus=event_bus)
+streams = {}  # stream_id -> FrameStream actif
+
+# Sessions multi-caméras : un processus de reconnaissance par caméra (présences relayées sur event_bus)
+session_manager = SessionManager(database.db_name, detector_options={"tolerance": 0.6}, event_bus=event_bus)
+
+# Inscription en masse : décodage et encodage dans un pool de processus
+enroller = BulkEnroller(database, detector, detector_options={"tolerance": 0.6})
 
 # --- Pydantic Models ---
 class ProfessorCreate(BaseModel):
@@ -50,6 +81,12 @@ class StudentCreate(BaseModel):
 class SessionRequest(BaseModel):
     professor_id: int
     subject: Optional[str] = None
+    source: str = Field("0", description="Index de périphérique, chemin de fichier vidéo ou URL HTTP/RTSP")
+    headless: bool = Field(False, description="Sans fenêtre OpenCV (serveur sans affichage), arrêt via /sessions/{id}/stop")
+
+class CameraRequest(BaseModel):
+    source: str = Field("0", description="Index de périphérique, chemin de fichier vidéo ou URL HTTP/RTSP")
+    recognition_workers: int = Field(1, ge=1, le=16, description="Processus de reconnaissance (> 1 : anneau d'images partagé)")
 
 # --- Endpoints Health ---
 @app.get("/health")
@@ -58,8 +95,8 @@ def health_check():
 
 # --- Professors ---
 @app.get("/professors")
-def list_professors():
-    professors = database.get_all_professors()
+async def list_professors():
+    professors = await async_db.get_all_professors()
     return [
         {
             "id": prof[0],
@@ -72,8 +109,8 @@ def list_professors():
     ]
 
 @app.post("/professors", status_code=201)
-def create_professor(payload: ProfessorCreate):
-    professor_id = database.add_professor(
+async def create_professor(payload: ProfessorCreate):
+    professor_id = await async_db.add_professor(
         payload.first_name.strip(),
         payload.last_name.strip(),
         payload.subject.strip(),
@@ -84,8 +121,8 @@ def create_professor(payload: ProfessorCreate):
 
 # --- Students ---
 @app.get("/students")
-def list_students():
-    students = database.get_all_students()
+async def list_students():
+    students = await async_db.get_all_students()
     return [
         {
             "id": student[0],
@@ -192,10 +229,13 @@ def capture_student_from_webcam(
             first_name.strip(),
             last_name.strip(),
             photo_path,
-            encoding.tolist(),
+            encoding,
+            model=detector.encoding_model,
         )
         
-        detector.load_encodings_from_database(database)
+        if student_id is not None:
+            student = {"id": student_id, "name": f"{first_name.strip()} {last_name.strip()}"}
+            detector.add_known_faces([student], [encoding], database)
         
         return {
             "id": student_id,
@@ -318,12 +358,15 @@ def create_student(
             first_name.strip(),
             last_name.strip(),
             photo_path,
-            encoding.tolist(),
+            encoding,
+            model=detector.encoding_model,
         )
         print(f"✅ Étudiant créé avec ID: {student_id}")
 
-        # Recharger les encodages
-        detector.load_encodings_from_database(database)
+        # Ajouter l'encodage à la galerie en mémoire
+        if student_id is not None:
+            student = {"id": student_id, "name": f"{first_name.strip()} {last_name.strip()}"}
+            detector.add_known_faces([student], [encoding], database)
         
         print(f"{'='*70}")
         print(f"✅ SUCCÈS: {first_name} {last_name} ajouté")
@@ -344,6 +387,30 @@ def create_student(
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Erreur serveur: {str(e)}")
+
+
+@app.post("/students/bulk", status_code=201)
+def bulk_create_students(
+    files: List[UploadFile] = File(...),
+    manifest: Optional[str] = Form(None),
+):
+    """Inscrit une classe entière : archive zip ou plusieurs images, avec manifeste optionnel"""
+    try:
+        images, archive_manifest = collect_images([(f.filename or "", f.file.read()) for f in files])
+    except zipfile.BadZipFile:
+        raise HTTPException(status_code=400, detail="Archive zip invalide")
+    if not images:
+        raise HTTPException(status_code=400, detail="Aucune image reçue")
+
+    try:
+        report = enroller.enroll(images, manifest or archive_manifest)
+    except (ValueError, KeyError, IndexError) as exc:
+        raise HTTPException(status_code=400, detail=f"Manifeste invalide: {exc}") from exc
+
+    print(f"✓ Inscription en masse : {report['enrolled']}/{len(images)} étudiant(s) "
+          f"({report['images_per_sec']} images/s)")
+    return report
+
 # BONUS: Endpoint de validation de photo
 @app.post("/students/validate-photo")
 def validate_student_photo(file: UploadFile = File(...)):
@@ -398,85 +465,375 @@ def validate_student_photo(file: UploadFile = File(...)):
 
 # --- Sessions ---
 @app.post("/sessions/start")
-def start_session(request: SessionRequest):
-    professors = database.get_all_professors()
+async def start_session(request: SessionRequest):
+    if detector.running:
+        raise HTTPException(status_code=409, detail=f"Séance {detector.session_id} déjà en cours")
+
+    professors = await async_db.get_all_professors()
     professor = next((p for p in professors if p[0] == request.professor_id), None)
     if professor is None:
         raise HTTPException(status_code=404, detail="Professeur introuvable")
 
     # Vérifier qu'il y a des étudiants
-    students = database.get_all_students()
+    students = await async_db.get_all_students()
     if not students:
         raise HTTPException(status_code=400, detail="Aucun étudiant enregistré")
 
-    # Charger les encodages
-    detector.load_encodings_from_database(database)
+    # Vérifier que la galerie reflète la base (rechargement seulement si désynchronisée)
+    await async_db.run(detector.sync_gallery, database)
     if len(detector.known_encodings) == 0:
         raise HTTPException(status_code=400, detail="Aucun encodage disponible")
 
+    # Source vidéo ouverte une fois avant de créer la séance : une source invalide ne laisse pas de séance ouverte
+    source = parse_video_source(request.source)
+    if not await asyncio.get_running_loop().run_in_executor(None, _video_source_opens, source):
+        raise HTTPException(status_code=400, detail=f"Source vidéo inaccessible : {request.source}")
+
     subject = request.subject.strip() if request.subject else professor[3]
-    session_id = database.create_session(request.professor_id, subject)
+    session_id = await async_db.create_session(request.professor_id, subject)
     if not session_id:
         raise HTTPException(status_code=500, detail="Impossible de créer la séance")
 
-    # Démarrer la session de présence dans un thread (webcam s'ouvre automatiquement)
-    detector.start_attendance_session(database, session_id)
+    # Démarrer la session de présence dans un thread (la source vidéo est rouverte par le pipeline)
+    detector.start_attendance_session(database, session_id, event_bus=event_bus,
+                                      source=source, headless=request.headless)
 
-    return {"session_id": session_id, "subject": subject, "professor": f"{professor[1]} {professor[2]}"}
+    return {
+        "session_id": session_id,
+        "subject": subject,
+        "professor": f"{professor[1]} {professor[2]}",
+        "source": request.source,
+        "headless": request.headless,
+    }
+
+def _video_source_opens(source):
+    cap = cv2.VideoCapture(source)
+    try:
+        return cap.isOpened()
+    finally:
+        cap.release()
+
+@app.get("/sessions/{session_id}/live")
+def session_live_status(session_id: int):
+    """État de la séance locale en cours : FPS de capture et de reconnaissance, présents"""
+    if detector.session_id != session_id:
+        raise HTTPException(status_code=404, detail=f"Séance {session_id} non active sur ce serveur")
+    return detector.live_status()
+
+@app.post("/sessions/{session_id}/stop")
+async def stop_session(session_id: int):
+    """Arrête la prise de présence de la séance (dernières présences écrites) et clôture la séance"""
+    if await async_db.get_session(session_id) is None:
+        raise HTTPException(status_code=404, detail=f"Session {session_id} introuvable")
+
+    stats = None
+    if detector.session_id == session_id:
+        live = detector.live_status()
+        stats = await asyncio.get_running_loop().run_in_executor(None, detector.stop_attendance_session)
+        stats.update(capture_fps=live["capture_fps"], recognition_fps=live["recognition_fps"],
+                     error=detector.session_error)
+    await async_db.end_session(session_id)
+    event_bus.end_session(session_id)
+
+    return {"session_id": session_id, "ended": True, "stats": stats,
+            "summary": await async_db.get_session_stats(session_id)}
 
 @app.post("/sessions/{session_id}/detect")
-def detect_faces(session_id: int, file: UploadFile = File(...)):
-    """Détecte les visages dans une image uploadée"""
-    # Lire l'image
-    np_img = np.frombuffer(file.file.read(), np.uint8)
-    frame = cv2.imdecode(np_img, cv2.IMREAD_COLOR)
+async def detect_faces(session_id: int, file: UploadFile = File(...)):
+    """Détecte les visages dans une image uploadée (décodage et reconnaissance dans le pool dédié)"""
+    future = recognition_pool.submit(await file.read())
+    if future is None:
+        raise HTTPException(
+            status_code=429,
+            detail="Reconnaissance saturée, réessayez plus tard",
+            headers={"Retry-After": str(recognition_pool.retry_after())},
+        )
+    result = await asyncio.wrap_future(future)
     
-    if frame is None:
+    detected_faces = result["faces"]
+    if detected_faces is None:
         raise HTTPException(status_code=400, detail="Image invalide")
     
-    detected_faces = detector.detect_faces_in_frame(frame, return_all_faces=True)
-    
-    # Formater les résultats
+    return {
+        "detected_faces": _format_faces(detected_faces),
+        "count": len(detected_faces),
+        "timing": {"queue_wait_ms": result["queue_wait_ms"], "service_ms": result["service_ms"]}
+    }
+
+@app.post("/sessions/{session_id}/detect-batch")
+async def detect_faces_batch(
+    session_id: int,
+    files: List[UploadFile] = File(...),
+    mark: bool = Form(False),
+):
+    """Détecte les visages de plusieurs images (fichiers ou archive zip) en une requête
+
+    Résultats par image dans l'ordre reçu ; avec mark=true, les étudiants
+    reconnus sont marqués présents en une seule transaction.
+    """
+    start = time.perf_counter()
+    if mark and await async_db.get_session(session_id) is None:
+        raise HTTPException(status_code=404, detail=f"Session {session_id} introuvable")
+
+    uploads = [(f.filename or "", await f.read()) for f in files]
+    try:
+        images, _ = await asyncio.get_running_loop().run_in_executor(None, collect_images, uploads)
+    except zipfile.BadZipFile:
+        raise HTTPException(status_code=400, detail="Archive zip invalide")
+    if not images:
+        raise HTTPException(status_code=400, detail="Aucune image reçue")
+
+    future = recognition_pool.submit_batch([data for _, data in images])
+    if future is None:
+        raise HTTPException(
+            status_code=429,
+            detail="Reconnaissance saturée, réessayez plus tard",
+            headers={"Retry-After": str(recognition_pool.retry_after())},
+        )
+    result = await asyncio.wrap_future(future)
+
     results = []
-    for face in detected_faces:
-        results.append({
+    recognized = {}  # étudiant → (fiche, meilleure confiance)
+    for (filename, _), faces in zip(images, result["faces"]):
+        if faces is None:
+            results.append({"file": filename, "error": "Image invalide", "detected_faces": [], "count": 0})
+            continue
+        results.append({"file": filename, "detected_faces": _format_faces(faces), "count": len(faces)})
+        for face in faces:
+            student = face["student"]
+            if student.get("id", -1) != -1 and face["confidence"] > recognized.get(student["id"], (None, -1))[1]:
+                recognized[student["id"]] = (student, face["confidence"])
+
+    marked = []
+    if mark and recognized:
+        already = {a["student_id"] for a in await async_db.get_session_attendance(session_id)}
+        check_in = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        records = [(student, confidence, check_in)
+                   for student_id, (student, confidence) in recognized.items() if student_id not in already]
+        if records:
+            inserted = await async_db.mark_attendance_batch(
+                session_id, [(student["id"], check_in) for student, _, _ in records])
+            if inserted is None:
+                raise HTTPException(status_code=500, detail="Erreur enregistrement présences")
+            records = [record for record in records if record[0]["id"] in inserted]
+            if records:
+                await async_db.run(event_bus.publish_checkins, database, session_id, records)
+            marked = [student["id"] for student, _, _ in records]
+
+    elapsed = time.perf_counter() - start
+    print(f"✓ Détection par lot : {len(images)} image(s), {result['encoded_faces']} visage(s), "
+          f"{len(marked)} présence(s)")
+    return {
+        "count": len(images),
+        "recognized": sorted(recognized),
+        "marked": marked,
+        "seconds": round(elapsed, 3),
+        "images_per_sec": round(len(images) / elapsed, 1) if elapsed > 0 else 0.0,
+        "timing": {"queue_wait_ms": result["queue_wait_ms"], "service_ms": result["service_ms"]},
+        "results": results,
+    }
+
+def _format_faces(detected_faces):
+    return [
+        {
             "student_id": face["student"].get("id", -1),
             "student_name": face["student"].get("name", "Inconnu"),
             "confidence": face.get("confidence", 0),
             "location": face["location"]
-        })
-    
+        }
+        for face in detected_faces
+    ]
+
+@app.get("/recognition/stats")
+def recognition_stats():
+    """Charge du pool de reconnaissance : requêtes en cours, refusées, attente et service (p50/p99)"""
+    return recognition_pool.stats()
+
+
+# --- Flux WebSocket (reconnaissance continue) ---
+@app.websocket("/sessions/{session_id}/stream")
+async def stream_session(websocket: WebSocket, session_id: int):
+    """Le client envoie des images JPEG (messages binaires), le serveur répond un résultat JSON par image traitée.
+
+    Si la reconnaissance prend du retard, seules les images les plus récentes sont traitées.
+    """
+    if await async_db.get_session(session_id) is None:
+        await websocket.close(code=1008, reason=f"Session {session_id} introuvable")
+        return
+
+    await websocket.accept()
+    stream = FrameStream(session_id)
+    streams[stream.id] = stream
+    recorder = recorders.acquire(session_id)
+
+    async def receive_frames():
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                if message.get("bytes"):
+                    stream.push(message["bytes"])
+        finally:
+            stream.close()
+
+    receiver = asyncio.create_task(receive_frames())
+    try:
+        while True:
+            frame = await stream.next_frame()
+            if frame is None:
+                break
+            seq, data, received_at = frame
+
+            future = recognition_pool.submit(data)
+            if future is None:
+                stream.drop()  # pool saturé (autres flux, uploads) : image suivante
+                continue
+            result = await asyncio.wrap_future(future)
+            if result["faces"] is None:
+                await websocket.send_json({"type": "error", "frame": seq, "detail": "Image invalide"})
+                continue
+
+            marked = [
+                face["student"]["id"] for face in result["faces"]
+                if face["student"].get("id", -1) != -1 and recorder.record(face["student"], face.get("confidence"))
+            ]
+            latency_ms = stream.done(received_at)
+            await websocket.send_json({
+                "type": "result",
+                "frame": seq,
+                "detected_faces": _format_faces(result["faces"]),
+                "marked": marked,
+                "timing": {
+                    "latency_ms": round(latency_ms, 2),
+                    "queue_wait_ms": result["queue_wait_ms"],
+                    "service_ms": result["service_ms"],
+                },
+                "processed": stream.processed,
+                "dropped": stream.dropped,
+            })
+    except (WebSocketDisconnect, RuntimeError):
+        pass  # client parti pendant l'envoi
+    finally:
+        stream.close()
+        receiver.cancel()
+        streams.pop(stream.id, None)
+        await asyncio.get_running_loop().run_in_executor(None, recorders.release, session_id)
+
+@app.get("/sessions/{session_id}/streams")
+def list_session_streams(session_id: int):
+    """Flux actifs de la séance : images reçues, traitées, sautées et latence (p50/p99)"""
+    recorder = recorders.get(session_id)
     return {
-        "detected_faces": results,
-        "count": len(detected_faces)
+        "session_id": session_id,
+        "streams": [s.stats() for s in list(streams.values()) if s.session_id == session_id],
+        "recorder": recorder.stats() if recorder else None,
     }
 
 
+# --- Événements de présence (Server-Sent Events) ---
+@app.get("/sessions/{session_id}/events")
+async def session_events(
+    session_id: int,
+    last_event_id: Optional[int] = Header(None),
+    since: Optional[int] = None,
+):
+    """Flux SSE des présences : événements `checkin`, `stats` et `reset` (relire l'état complet).
+
+    La reconnexion reprend après Last-Event-ID (en-tête envoyé par EventSource, ou ?since=).
+    """
+    if await async_db.get_session(session_id) is None:
+        raise HTTPException(status_code=404, detail=f"Session {session_id} introuvable")
+
+    subscription = event_bus.subscribe(session_id, last_event_id if last_event_id is not None else since)
+
+    async def event_stream():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                events = await subscription.next_events(timeout=15)
+                if not events:
+                    yield ": keepalive\n\n"
+                    continue
+                yield "".join(f"id: {event_id}\nevent: {event_type}\ndata: {payload}\n\n"
+                              for event_id, event_type, payload in events)
+        finally:
+            subscription.close()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# --- Cameras (sessions multi-caméras) ---
+@app.post("/sessions/{session_id}/cameras", status_code=201)
+def start_camera(session_id: int, request: CameraRequest):
+    """Lance un processus de reconnaissance pour une caméra de la séance"""
+    detector.sync_gallery(database)
+    if len(detector.known_encodings) == 0:
+        raise HTTPException(status_code=400, detail="Aucun encodage disponible")
+
+    worker_id = session_manager.start(session_id, request.source, detector.gallery,
+                                      recognition_workers=request.recognition_workers)
+    return {"worker_id": worker_id, "session_id": session_id, "source": request.source}
+
+@app.get("/cameras")
+def list_cameras():
+    return {"cameras": session_manager.status()}
+
+@app.get("/sessions/{session_id}/cameras")
+def list_session_cameras(session_id: int):
+    return {"session_id": session_id, "cameras": session_manager.status(session_id=session_id)}
+
+@app.get("/cameras/{worker_id}")
+def get_camera(worker_id: int):
+    status = session_manager.status(worker_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"Caméra {worker_id} introuvable")
+    return status
+
+@app.delete("/cameras/{worker_id}")
+def stop_camera(worker_id: int):
+    status = session_manager.stop(worker_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"Caméra {worker_id} introuvable")
+    return status
+
+
 # --- Reports ---
 @app.get("/sessions/{session_id}/stats")
-def get_session_stats(session_id: int):
-    stats = database.get_session_stats(session_id)
+async def get_session_stats(session_id: int):
+    stats = await async_db.get_session_stats(session_id)
     return {"session_id": session_id, "stats": stats}
 
 
-from fastapi.responses import FileResponse
-
 @app.get("/sessions/{session_id}/report")
-def download_report(session_id: int):
-    try:
-        # Ici on récupère le nom complet du fichier généré par la fonction
-        filename = database.export_attendance_to_csv(session_id)
-    except Exception as exc:
-        raise HTTPException(status_code=400, detail=str(exc)) from exc
-
-    if not os.path.exists(filename):
-        raise HTTPException(status_code=404, detail="Report not found")
-
-    return FileResponse(
-        path=os.path.abspath(filename),
-        media_type="text/csv",
-        filename=os.path.basename(filename),  # navigateur utilisera ce nom
-    )
+async def download_report(session_id: int, save: bool = False):
+    """Rapport CSV de la séance, diffusé par morceaux (copie dans reports/ si save=true)"""
+    session = await async_db.get_session(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"Session {session_id} introuvable")
+    subject, session_date = session
+    filename = database.report_filename(session_id, subject, session_date)
+
+    chunks = database.iter_attendance_csv(session_id, subject)
+    if save:
+        chunks = _tee_to_file(chunks, os.path.join("reports", filename))
+
+    quoted = quote(filename)
+    disposition = (f'attachment; filename="{filename}"' if quoted == filename
+                   else f"attachment; filename*=utf-8''{quoted}")  # navigateur utilisera ce nom
+    return StreamingResponse(chunks, media_type="text/csv", headers={"Content-Disposition": disposition})
+
+def _tee_to_file(chunks, path):
+    """Recopie sur disque les morceaux diffusés au client"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        for chunk in chunks:
+            f.write(chunk)
+            yield chunk
 
 
  # Ajoutez ces endpoints à votre fichier api.py
@@ -484,30 +841,30 @@ def download_report(session_id: int):
 # --- DELETE Endpoints ---
 
 @app.delete("/students/{student_id}")
-def delete_student(student_id: int):
+async def delete_student(student_id: int):
     """Supprime un étudiant et sa photo"""
-    success = database.delete_student(student_id)
+    success = await async_db.delete_student(student_id)
     if not success:
         raise HTTPException(status_code=404, detail=f"Étudiant {student_id} introuvable")
     
-    # Recharger les encodages dans le détecteur
-    detector.load_encodings_from_database(database)
+    # Retirer l'étudiant de la galerie en mémoire
+    await async_db.run(detector.remove_known_faces, [student_id], database)
     
     return {
         "message": f"Étudiant {student_id} supprimé avec succès",
-        "remaining_students": len(database.get_all_students())
+        "remaining_students": len(await async_db.get_all_students())
     }
 
 @app.delete("/professors/{professor_id}")
-def delete_professor(professor_id: int):
+async def delete_professor(professor_id: int):
     """Supprime un professeur"""
-    success = database.delete_professor(professor_id)
+    success = await async_db.delete_professor(professor_id)
     if not success:
         raise HTTPException(status_code=404, detail=f"Professeur {professor_id} introuvable")
     
     return {
         "message": f"Professeur {professor_id} supprimé avec succès",
-        "remaining_professors": len(database.get_all_professors())
+        "remaining_professors": len(await async_db.get_all_professors())
     }
 
 # BONUS: Endpoint pour nettoyer les étudiants sans photo
@@ -529,9 +886,9 @@ def cleanup_students():
                     "missing_photo": photo_path
                 })
     
-    # Recharger les encodages
+    # Retirer les étudiants de la galerie en mémoire
     if deleted:
-        detector.load_encodings_from_database(database)
+        detector.remove_known_faces([d["id"] for d in deleted], database)
     
     return {
         "cleaned": len(deleted),
@@ -542,30 +899,6 @@ def cleanup_students():
 
 
 @app.get("/sessions/{session_id}/attendance")
-def get_session_attendance(session_id: int):
+async def get_session_attendance(session_id: int):
     """Récupère la liste des présences pour une séance"""
-    conn = sqlite3.connect(database.db_name)
-    c = conn.cursor()
-    
-    try:
-        c.execute('''
-            SELECT student_id, check_in_time, status
-            FROM attendance
-            WHERE session_id = ?
-            ORDER BY check_in_time
-        ''', (session_id,))
-        
-        results = c.fetchall()
-        
-        attendance = [
-            {
-                "student_id": row[0],
-                "check_in_time": row[1],
-                "status": row[2]
-            }
-            for row in results
-        ]
-        
-        return {"session_id": session_id, "attendance": attendance}
-    finally:
-        conn.close()
\ No newline at end of file
+    return {"session_id": session_id, "attendance": await async_db.get_session_attendance(session_id)}
\ No newline at end of file
@@ -0,0 +1,156 @@
+"""
+Benchmark : endpoints sync (threadpool FastAPI) vs async (threads dédiés à la base)
+
+Deux serveurs uvicorn exposent les endpoints les plus appelés (/students,
+/sessions/{id}/stats, /sessions/{id}/attendance), en version sync comme
+l'ancienne API et en version async via AsyncAttendanceDatabase. Des
+clients concurrents les interrogent pendant que d'autres requêtes
+bloquantes (comme /sessions/{id}/detect) occupent le threadpool.
+
+Usage (depuis la racine du projet) :
+    python -m benchmarks.bench_api [--clients 16] [--blocking 48] [--blocking-ms 1000] [--duration 5]
+"""
+
+import argparse
+import asyncio
+import os
+import multiprocessing as mp
+import socket
+import tempfile
+import time
+
+import httpx
+import numpy as np
+import uvicorn
+from fastapi import FastAPI
+
+from async_database import AsyncAttendanceDatabase
+from database import AttendanceDatabase
+
+
+def _make_app(database, async_db, blocking_ms):
+    app = FastAPI()
+
+    @app.post("/blocking")
+    def blocking():
+        time.sleep(blocking_ms / 1000)  # reconnaissance, décodage d'image...
+        return {}
+
+    if async_db is None:
+        @app.get("/students")
+        def list_students():
+            return [{"id": s[0], "first_name": s[1], "last_name": s[2]} for s in database.get_all_students()]
+
+        @app.get("/sessions/{session_id}/stats")
+        def stats(session_id: int):
+            return database.get_session_stats(session_id)
+
+        @app.get("/sessions/{session_id}/attendance")
+        def attendance(session_id: int):
+            return database.get_session_attendance(session_id)
+    else:
+        @app.get("/students")
+        async def list_students():
+            return [{"id": s[0], "first_name": s[1], "last_name": s[2]} for s in await async_db.get_all_students()]
+
+        @app.get("/sessions/{session_id}/stats")
+        async def stats(session_id: int):
+            return await async_db.get_session_stats(session_id)
+
+        @app.get("/sessions/{session_id}/attendance")
+        async def attendance(session_id: int):
+            return await async_db.get_session_attendance(session_id)
+
+    return app
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _serve(db_path, use_async, blocking_ms, port):
+    """Processus serveur (client et serveur ne partagent pas le GIL)"""
+    database = AttendanceDatabase(db_path)
+    app = _make_app(database, AsyncAttendanceDatabase(database) if use_async else None, blocking_ms)
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def _wait_ready(url):
+    for _ in range(200):
+        try:
+            httpx.get(url + "/docs", timeout=1)
+            return
+        except httpx.TransportError:
+            time.sleep(0.05)
+    raise RuntimeError("serveur injoignable")
+
+
+async def _load(base_url, clients, blocking, duration):
+    paths = ["/students", "/sessions/1/stats", "/sessions/1/attendance"]
+    latencies = []
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+
+    # Deux clients : les requêtes bloquantes n'occupent pas le pool de connexions mesuré
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client, \
+            httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as background:
+        async def hot(k):
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                r = await client.get(paths[k % len(paths)])
+                r.raise_for_status()
+                latencies.append((time.perf_counter() - start) * 1000)
+                k += 1
+
+        async def blocking_client():
+            while time.perf_counter() < deadline:
+                await background.post("/blocking")
+
+        start = time.perf_counter()
+        await asyncio.gather(*[hot(k) for k in range(clients)], *[blocking_client() for _ in range(blocking)])
+        elapsed = time.perf_counter() - start
+
+    return len(latencies) / elapsed, np.percentile(latencies, 50), np.percentile(latencies, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=16, help="clients concurrents sur les endpoints DB")
+    parser.add_argument("--blocking", type=int, default=48, help="requêtes bloquantes concurrentes")
+    parser.add_argument("--blocking-ms", type=float, default=1000)
+    parser.add_argument("--students", type=int, default=300)
+    parser.add_argument("--duration", type=float, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        database = AttendanceDatabase(db_path)
+        database.add_students_batch([(f"Prenom{i}", f"Nom{i}", None, None, None) for i in range(args.students)])
+        session_id = database.create_session(1, "Cours")
+        database.mark_attendance_batch(session_id, [(i, "2026-01-01 08:00:00") for i in range(1, args.students // 2)])
+        database.close()
+
+        print(f"\n{args.clients} clients, jusqu'à {args.blocking} requêtes bloquantes "
+              f"({args.blocking_ms:.0f} ms) en parallèle, {args.duration:.0f} s par mesure\n")
+        print(f"{'Endpoints':<10} {'Bloquantes':>10} {'req/s':>10} {'p50 ms':>10} {'p99 ms':>10}")
+        print("-" * 54)
+        ctx = mp.get_context("spawn")
+        for blocking in (0, args.blocking):
+            for label, use_async in [("sync", False), ("async", True)]:
+                port = _free_port()
+                server = ctx.Process(target=_serve, args=(db_path, use_async, args.blocking_ms, port), daemon=True)
+                server.start()
+                try:
+                    url = f"http://127.0.0.1:{port}"
+                    _wait_ready(url)
+                    rps, p50, p99 = asyncio.run(_load(url, args.clients, blocking, args.duration))
+                finally:
+                    server.terminate()
+                    server.join()
+                print(f"{label:<10} {blocking:>10} {rps:>10.0f} {p50:>10.1f} {p99:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
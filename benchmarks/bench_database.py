@@ -0,0 +1,132 @@
+"""
+Benchmark : connexions SQLite persistantes (WAL) vs une connexion par appel
+
+Compare AttendanceDatabase à l'ancien schéma d'accès (sqlite3.connect à
+chaque méthode, journal par défaut) sur les opérations les plus fréquentes,
+en mono-thread puis avec plusieurs threads concurrents (cas de l'API).
+
+Usage (depuis la racine du projet) :
+    python -m benchmarks.bench_database [--ops 2000] [--threads 8] [--students 500]
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from database import AttendanceDatabase
+
+
+class LegacyDatabase:
+    """Reproduit l'ancien accès : une connexion ouverte et fermée à chaque appel"""
+
+    def __init__(self, db_name):
+        self.db_name = db_name
+
+    def mark_attendance(self, session_id, student_id):
+        conn = sqlite3.connect(self.db_name)
+        c = conn.cursor()
+        check_in = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        try:
+            c.execute('INSERT OR IGNORE INTO attendance (session_id, student_id, check_in_time) VALUES (?, ?, ?)',
+                      (session_id, student_id, check_in))
+            conn.commit()
+            return True
+        except sqlite3.Error:
+            return False
+        finally:
+            conn.close()
+
+    def get_all_students(self):
+        conn = sqlite3.connect(self.db_name)
+        c = conn.cursor()
+        c.execute('SELECT id, first_name, last_name, photo_path FROM students ORDER BY last_name')
+        data = c.fetchall()
+        conn.close()
+        return data
+
+    def get_session_stats(self, session_id):
+        conn = sqlite3.connect(self.db_name)
+        c = conn.cursor()
+        c.execute('SELECT COUNT(*) FROM students')
+        total = c.fetchone()[0]
+        c.execute('SELECT COUNT(*) FROM attendance WHERE session_id = ?', (session_id,))
+        present = c.fetchone()[0]
+        conn.close()
+        return {"total": total, "present": present}
+
+
+def _prepare(path, n_students, legacy=False):
+    db = AttendanceDatabase(path)
+    for i in range(n_students):
+        db.add_student(f"Prenom{i}", f"Nom{i}")
+    db.close()
+    if legacy:
+        # L'ancien code ne passait jamais en WAL
+        conn = sqlite3.connect(path)
+        conn.execute('PRAGMA journal_mode=DELETE')
+        conn.close()
+
+
+def _workload(db, n_ops, n_students, offset):
+    """Mélange représentatif : sur 10 appels, 6 marquages, 3 stats, 1 liste"""
+    failures = 0
+    for i in range(n_ops):
+        k = offset + i
+        kind = i % 10
+        if kind < 6:
+            failures += not db.mark_attendance(1 + k // n_students, 1 + k % n_students)
+        elif kind < 9:
+            db.get_session_stats(1)
+        else:
+            db.get_all_students()
+    return failures
+
+
+def _run(db, args, threads):
+    per_thread = args.ops // threads
+    failures = []
+
+    def target(t):
+        failures.append(_workload(db, per_thread, args.students, t * per_thread))
+
+    workers = [threading.Thread(target=target, args=(t,)) for t in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return per_thread * threads / (time.perf_counter() - start), sum(failures)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ops", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--students", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, "legacy.db")
+        pooled_path = os.path.join(tmp, "pooled.db")
+        _prepare(legacy_path, args.students, legacy=True)
+        _prepare(pooled_path, args.students)
+
+        legacy = LegacyDatabase(legacy_path)
+        pooled = AttendanceDatabase(pooled_path)
+
+        print(f"\n{args.ops} opérations (60% marquage, 30% stats, 10% liste), {args.students} étudiants\n")
+        print(f"{'Accès':<28} {'Threads':>8} {'ops/s':>10} {'échecs':>8}")
+        print("-" * 58)
+        for threads in (1, args.threads):
+            for label, db in [("connexion par appel", legacy), ("connexions persistantes", pooled)]:
+                ops, failures = _run(db, args, threads)
+                print(f"{label:<28} {threads:>8} {ops:>10.0f} {failures:>8}")
+        pooled.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Benchmark : encodage visage par visage vs encodage par lots
+
+Utilise le modèle OpenFace s'il est présent (openface.nn4.small2.v1.t7),
+sinon le fallback histogramme + LBP.
+
+Usage (depuis la racine du projet) :
+    python -m benchmarks.bench_encoding [--faces 30] [--batch 32] [--repeat 5]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from face_detector import FaceDetector
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--faces", type=int, default=30, help="Visages par image (amphithéâtre)")
+    parser.add_argument("--batch", type=int, default=32, help="Taille maximale d'un lot")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    detector = FaceDetector(max_batch_size=args.batch)
+    backend = "OpenFace" if detector.face_recognizer is not None else "histogramme + LBP"
+
+    rng = np.random.default_rng(0)
+    crops = [rng.integers(0, 256, size=(rng.integers(60, 160),) * 2 + (3,), dtype=np.uint8)
+             for _ in range(args.faces)]
+
+    def per_face():
+        return [detector._encode_batch([crop])[0] for crop in crops]
+
+    def batched():
+        return detector._extract_face_encodings(crops)
+
+    per_face(), batched()  # préchauffage
+    results = {}
+    for label, fn in [("Un appel par visage", per_face), (f"Lots de {args.batch}", batched)]:
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - start)
+        results[label] = best
+
+    print(f"Encodeur : {backend} — {args.faces} visages par image\n")
+    print(f"{'Méthode':<24} {'ms/image':>10} {'visages/s':>11}")
+    print("-" * 47)
+    for label, t in results.items():
+        print(f"{label:<24} {t * 1000:>10.2f} {args.faces / t:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark : anneau d'images partagé vs multiprocessing.Queue
+
+Un processus producteur envoie des images BGR à un processus consommateur
+qui accède aux pixels puis acquitte. On mesure le coût d'un transfert
+(aller producteur → consommateur) et le débit en images par seconde.
+
+Usage (depuis la racine du projet) :
+    python -m benchmarks.bench_frame_bus [--frames 300] [--width 1920] [--height 1080]
+"""
+
+import argparse
+import multiprocessing as mp
+import time
+
+import numpy as np
+
+from frame_bus import SharedFrameRing
+
+
+def _queue_consumer(frames_q, ack_q, n):
+    for _ in range(n):
+        frame = frames_q.get()
+        ack_q.put(int(frame[0, 0, 0]))
+
+
+def _ring_consumer(ring_name, ack_q, n):
+    ring = SharedFrameRing(ring_name)
+    last = 0
+    for _ in range(n):
+        while True:
+            seq, frame = ring.latest(last)
+            if frame is not None:
+                break
+        last = seq
+        ack_q.put(int(frame[0, 0, 0]))
+    ring.release()
+
+
+def _run(ctx, frames, args, use_ring):
+    ack_q = ctx.Queue()
+    if use_ring:
+        ring = SharedFrameRing(slots=4, max_shape=frames[0].shape)
+        consumer = ctx.Process(target=_ring_consumer, args=(ring.name, ack_q, args.frames))
+    else:
+        frames_q = ctx.Queue(maxsize=4)
+        consumer = ctx.Process(target=_queue_consumer, args=(frames_q, ack_q, args.frames))
+    consumer.start()
+
+    start = time.perf_counter()
+    for i in range(args.frames):
+        frame = frames[i % len(frames)]
+        if use_ring:
+            ring.write(frame)
+        else:
+            frames_q.put(frame)
+        ack_q.get()  # aller-retour : le consommateur a lu l'image
+    elapsed = time.perf_counter() - start
+
+    consumer.join()
+    if use_ring:
+        ring.release()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    args = parser.parse_args()
+
+    ctx = mp.get_context("spawn")
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 256, size=(args.height, args.width, 3), dtype=np.uint8) for _ in range(4)]
+    mb = frames[0].nbytes / 1e6
+
+    print(f"{args.frames} images {args.width}x{args.height} ({mb:.1f} Mo chacune)\n")
+    print(f"{'Transport':<26} {'ms/image':>10} {'images/s':>10} {'Mo/s':>10}")
+    print("-" * 60)
+    for label, use_ring in [("multiprocessing.Queue", False), ("SharedFrameRing", True)]:
+        elapsed = _run(ctx, frames, args, use_ring)
+        fps = args.frames / elapsed
+        print(f"{label:<26} {elapsed / args.frames * 1000:>10.2f} {fps:>10.0f} {fps * mb:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Benchmark : statistiques et liste des présences d'une séance
+
+Compare l'ancien accès (deux COUNT séparés, connexion brute par appel,
+aucun index secondaire) aux requêtes indexées d'AttendanceDatabase sur
+une base de plus de 100 000 présences, avec des encodages 512D en base
+comme en production.
+
+Usage (depuis la racine du projet) :
+    python -m benchmarks.bench_queries [--students 2000] [--sessions 100] [--calls 200]
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+
+import numpy as np
+
+from database import AttendanceDatabase, encoding_to_blob
+
+
+def _legacy_stats(db_name, session_id):
+    conn = sqlite3.connect(db_name)
+    c = conn.cursor()
+    c.execute('SELECT COUNT(*) FROM students')
+    total = c.fetchone()[0]
+    c.execute('SELECT COUNT(*) FROM attendance WHERE session_id = ?', (session_id,))
+    present = c.fetchone()[0]
+    conn.close()
+    return total, present
+
+
+def _legacy_attendance(db_name, session_id):
+    """Ancien endpoint GET /sessions/{id}/attendance"""
+    conn = sqlite3.connect(db_name)
+    c = conn.cursor()
+    try:
+        c.execute('''SELECT student_id, check_in_time, status FROM attendance
+                     WHERE session_id = ? ORDER BY check_in_time''', (session_id,))
+        return [{"student_id": r[0], "check_in_time": r[1], "status": r[2]} for r in c.fetchall()]
+    finally:
+        conn.close()
+
+
+def _populate(path, args):
+    db = AttendanceDatabase(path)
+    conn = db._connection()
+    rng = np.random.default_rng(0)
+    with conn:
+        conn.executemany(
+            'INSERT INTO students (first_name, last_name, encoding, dim, model) VALUES (?, ?, ?, ?, ?)',
+            [(f"Prenom{i}", f"Nom{i}", encoding_to_blob(rng.random(512)), 512, 'hist-lbp')
+             for i in range(args.students)],
+        )
+        conn.executemany(
+            'INSERT INTO sessions (professor_id, subject, session_date, start_time) VALUES (?, ?, ?, ?)',
+            [(1 + i % 10, "Cours", f"2026-01-{1 + i % 28:02d}", "08:00:00") for i in range(args.sessions)],
+        )
+        rows = []
+        for session_id in range(1, args.sessions + 1):
+            present = random.Random(session_id).sample(range(1, args.students + 1), int(args.students * 0.6))
+            rows += [(session_id, sid, f"2026-01-01 08:{k // 60 % 60:02d}:{k % 60:02d}")
+                     for k, sid in enumerate(present)]
+        conn.executemany('INSERT INTO attendance (session_id, student_id, check_in_time) VALUES (?, ?, ?)', rows)
+    db.close()
+    return len(rows)
+
+
+def _latencies(fn, calls, n_sessions):
+    samples = []
+    for i in range(calls):
+        start = time.perf_counter()
+        fn(1 + (i * 7919) % n_sessions)
+        samples.append((time.perf_counter() - start) * 1000)
+    return np.percentile(samples, 50), np.percentile(samples, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=2000)
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        indexed_path = os.path.join(tmp, "indexed.db")
+        legacy_path = os.path.join(tmp, "legacy.db")
+        n_rows = _populate(indexed_path, args)
+
+        # Copie sans les index secondaires ni WAL, comme l'ancien schéma
+        shutil.copy(indexed_path, legacy_path)
+        conn = sqlite3.connect(legacy_path)
+        for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'idx_%'").fetchall():
+            conn.execute(f'DROP INDEX {name}')
+        conn.execute('PRAGMA journal_mode=DELETE')
+        conn.commit()
+        conn.close()
+
+        db = AttendanceDatabase(indexed_path)
+        print(f"\n{args.students} étudiants, {args.sessions} séances, {n_rows} présences\n")
+        print(f"{'Requête':<34} {'p50 ms':>10} {'p99 ms':>10}")
+        print("-" * 56)
+        cases = [
+            ("stats (ancien)", lambda sid: _legacy_stats(legacy_path, sid)),
+            ("stats (indexé, 1 requête)", db.get_session_stats),
+            ("présences (ancien)", lambda sid: _legacy_attendance(legacy_path, sid)),
+            ("présences (index couvrant)", db.get_session_attendance),
+        ]
+        for label, fn in cases:
+            p50, p99 = _latencies(fn, args.calls, args.sessions)
+            print(f"{label:<34} {p50:>10.3f} {p99:>10.3f}")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
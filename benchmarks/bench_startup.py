@@ -0,0 +1,78 @@
+"""
+Benchmark : chargement de la galerie au démarrage, avec et sans instantané
+
+Mesure load_encodings_from_database sur un détecteur neuf (cas d'un
+nouveau processus ou de POST /sessions/start) :
+- sans instantané : lecture des encodages depuis SQLite ;
+- premier démarrage avec instantané : lecture SQLite + écriture du .npy ;
+- démarrages suivants : ouverture de l'instantané en mmap.
+
+Usage (depuis la racine du projet) :
+    python -m benchmarks.bench_startup [--students 20000] [--dim 512] [--repeat 5]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from database import AttendanceDatabase, encoding_to_blob
+from face_detector import FaceDetector
+
+
+def _load_ms(detector, database):
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        detector.load_encodings_from_database(database)
+        elapsed = time.perf_counter() - start
+    return elapsed * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        database = AttendanceDatabase(os.path.join(tmp, "bench.db"))
+        snapshot = os.path.join(tmp, "bench.gallery")
+        model = FaceDetector().encoding_model
+        rng = np.random.default_rng(0)
+        conn = database._connection()
+        with conn:
+            conn.executemany(
+                'INSERT INTO students (first_name, last_name, encoding, dim, model) VALUES (?, ?, ?, ?, ?)',
+                [(f"Prenom{i}", f"Nom{i}", encoding_to_blob(rng.random(args.dim)), args.dim, model)
+                 for i in range(args.students)],
+            )
+
+        without = [_load_ms(FaceDetector(), database) for _ in range(args.repeat)]
+        first = _load_ms(FaceDetector(gallery_snapshot=snapshot), database)
+        mapped = [_load_ms(FaceDetector(gallery_snapshot=snapshot), database) for _ in range(args.repeat)]
+
+        # Premier appariement : les pages de la matrice sont lues à la demande
+        detector = FaceDetector(gallery_snapshot=snapshot)
+        detector.load_encodings_from_database(database)
+        start = time.perf_counter()
+        detector.gallery.match(rng.random((1, args.dim)).astype(np.float32))
+        first_match = (time.perf_counter() - start) * 1000
+        database.close()
+
+    first_label = "premier, écriture de l'instantané"
+    print(f"\n{args.students} encodages {args.dim}D (médiane sur {args.repeat} démarrages)\n")
+    print(f"{'Démarrage':<40} {'ms':>10}")
+    print("-" * 52)
+    print(f"{'sans instantané (SQLite)':<40} {np.median(without):>10.1f}")
+    print(f"{first_label:<40} {first:>10.1f}")
+    print(f"{'avec instantané (mmap)':<40} {np.median(mapped):>10.1f}")
+    print(f"{'premier appariement après mmap':<40} {first_match:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,15 +3,92 @@ from datetime import datetime
 import pickle
 import os
 import csv
+import io
+import threading
+import weakref
+
+import numpy as np
+
+# Encodages stockés en float32 petit-boutiste brut (indépendant de la plateforme)
+ENCODING_DTYPE = np.dtype('<f4')
+
+
+def encoding_to_blob(encoding):
+    """Encodage (liste ou tableau) → octets float32 petit-boutiste"""
+    return np.asarray(encoding, dtype=ENCODING_DTYPE).ravel().tobytes()
+
+
+def blob_to_encoding(blob):
+    """Octets float32 petit-boutiste → tableau float32 (vue sans copie)"""
+    return np.frombuffer(blob, dtype=ENCODING_DTYPE)
+
+
+class _ThreadConnection:
+    """Porteur de la connexion d'un thread ; libéré (et la connexion fermée) à la fin du thread"""
+    __slots__ = ('conn', '__weakref__')
+
+    def __init__(self, conn):
+        self.conn = conn
+
+
+def _release_connection(conn, connections, lock):
+    with lock:
+        connections.discard(conn)
+    conn.close()
+
 
 class AttendanceDatabase:
-    def __init__(self, db_name='attendance_system.db'):
+    def __init__(self, db_name='attendance_system.db', busy_timeout_ms=5000, synchronous='NORMAL'):
         self.db_name = db_name
+        self.busy_timeout_ms = busy_timeout_ms
+        self.synchronous = synchronous
+
+        # Une connexion persistante par thread (évite le coût de connexion à chaque appel
+        # et réutilise le cache de requêtes préparées de sqlite3) ; fermée quand le thread se termine
+        self._local = threading.local()
+        self._connections = set()
+        self._connections_lock = threading.Lock()
+
         self.init_database()
-    
+
+    def _connect(self):
+        """Ouvre une connexion configurée (WAL, synchronous, busy_timeout)"""
+        conn = sqlite3.connect(
+            self.db_name,
+            timeout=self.busy_timeout_ms / 1000,
+            cached_statements=256,
+            check_same_thread=False,  # fermeture possible depuis close(); usage réservé au thread créateur
+        )
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(f'PRAGMA synchronous={self.synchronous}')
+        conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout_ms)}')
+        return conn
+
+    def _connection(self):
+        """Connexion du thread courant (créée au premier appel)"""
+        holder = getattr(self._local, 'holder', None)
+        if holder is None:
+            conn = self._connect()
+            holder = _ThreadConnection(conn)
+            with self._connections_lock:
+                self._connections.add(conn)
+            # threading.local oublie le porteur à la sortie du thread : la connexion est alors fermée
+            weakref.finalize(holder, _release_connection, conn, self._connections, self._connections_lock)
+            self._local.holder = holder
+        return holder.conn
+
+    def close(self):
+        """Ferme toutes les connexions ouvertes par cette instance"""
+        with self._connections_lock:
+            connections = list(self._connections)
+            self._connections.clear()
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
     def init_database(self):
         """Initialise la base de données avec les tables nécessaires"""
-        conn = sqlite3.connect(self.db_name)
+        conn = self._connection()
         c = conn.cursor()
         
         # Table des professeurs
@@ -30,6 +107,8 @@ class AttendanceDatabase:
             last_name TEXT NOT NULL,
             photo_path TEXT,
             encoding BLOB,
+            dim INTEGER,
+            model TEXT,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )''')
         
@@ -56,134 +135,251 @@ class AttendanceDatabase:
             UNIQUE(session_id, student_id)
         )''')
         
+        # Index des requêtes fréquentes (présences d'une séance, séances d'un professeur,
+        # liste triée des étudiants ; ce dernier sert aussi au COUNT(*) sans lire les encodages)
+        c.execute('CREATE INDEX IF NOT EXISTS idx_attendance_session_time '
+                  'ON attendance(session_id, check_in_time, student_id, status)')  # couvrant
+        c.execute('CREATE INDEX IF NOT EXISTS idx_sessions_professor_date ON sessions(professor_id, session_date)')
+        c.execute('CREATE INDEX IF NOT EXISTS idx_students_last_name ON students(last_name)')
+
+        # Compteur de modifications de la table students (empreinte de la galerie)
+        c.execute('''CREATE TABLE IF NOT EXISTS gallery_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )''')
+        c.execute('INSERT OR IGNORE INTO gallery_version (id, version) VALUES (1, 0)')
+        # Seules les colonnes vues par la galerie comptent (changer une photo ne force pas de rechargement)
+        update_event = 'UPDATE OF first_name, last_name, encoding, dim, model'
+        trigger_sql = c.execute("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = 'students_version_update'").fetchone()
+        if trigger_sql and update_event not in trigger_sql[0]:
+            c.execute('DROP TRIGGER students_version_update')  # anciennes bases : trigger sur toute la ligne
+        for name, event in (('insert', 'INSERT'), ('update', update_event), ('delete', 'DELETE')):
+            c.execute(f'''CREATE TRIGGER IF NOT EXISTS students_version_{name}
+                AFTER {event} ON students
+                BEGIN UPDATE gallery_version SET version = version + 1 WHERE id = 1; END''')
+
+        # Anciennes bases : colonnes dim/model absentes
+        columns = {row[1] for row in c.execute('PRAGMA table_info(students)')}
+        for column, decl in (('dim', 'INTEGER'), ('model', 'TEXT')):
+            if column not in columns:
+                c.execute(f'ALTER TABLE students ADD COLUMN {column} {decl}')
+
         conn.commit()
-        conn.close()
+        self._migrate_pickle_encodings()
         print("✓ Base de données initialisée avec succès")
+
+    def _migrate_pickle_encodings(self):
+        """Convertit sur place les encodages pickle (dim NULL) en float32 brut"""
+        conn = self._connection()
+        rows = conn.execute('SELECT id, encoding FROM students WHERE encoding IS NOT NULL AND dim IS NULL').fetchall()
+        if not rows:
+            return
+
+        updates = []
+        for student_id, blob in rows:
+            try:
+                encoding = np.asarray(pickle.loads(blob), dtype=np.float32).ravel()
+            except Exception as e:
+                print(f"⚠️ Encodage illisible pour étudiant {student_id}, ignoré: {e}")
+                continue
+            updates.append((encoding_to_blob(encoding), len(encoding), student_id))
+
+        if not updates:
+            return
+        with conn:
+            conn.executemany('UPDATE students SET encoding = ?, dim = ? WHERE id = ?', updates)
+        print(f"✓ {len(updates)} encodage(s) converti(s) au format float32")
     
 
     # === GESTION PROFESSEURS ===
     def add_professor(self, first_name, last_name, subject):
-        conn = sqlite3.connect(self.db_name)
-        c = conn.cursor()
+        conn = self._connection()
         try:
-            c.execute('''INSERT INTO professors (first_name, last_name, subject)
-                        VALUES (?, ?, ?)''', (first_name, last_name, subject))
-            conn.commit()
+            with conn:
+                c = conn.execute('''INSERT INTO professors (first_name, last_name, subject)
+                            VALUES (?, ?, ?)''', (first_name, last_name, subject))
             return c.lastrowid
         except:
             return None
-        finally:
-            conn.close()
     
     def get_all_professors(self):
-        conn = sqlite3.connect(self.db_name)
-        c = conn.cursor()
-        c.execute('SELECT * FROM professors ORDER BY last_name')
-        data = c.fetchall()
-        conn.close()
-        return data
+        return self._connection().execute('SELECT * FROM professors ORDER BY last_name').fetchall()
 
     def delete_professor(self, professor_id):
-        conn = sqlite3.connect(self.db_name)
-        c = conn.cursor()
+        conn = self._connection()
         try:
-            c.execute('DELETE FROM professors WHERE id = ?', (professor_id,))
-            conn.commit()
+            with conn:
+                conn.execute('DELETE FROM professors WHERE id = ?', (professor_id,))
             print(f"✓ Professeur {professor_id} supprimé")
             return True
         except Exception as e:
             print(f"✗ Erreur suppression professeur: {e}")
             return False
-        finally:
-            conn.close()
 
 
 
     # === GESTION ÉTUDIANTS ===
-    def add_student(self, first_name, last_name, photo_path=None, encoding=None):
-        conn = sqlite3.connect(self.db_name)
-        c = conn.cursor()
+    def add_student(self, first_name, last_name, photo_path=None, encoding=None, model=None):
+        conn = self._connection()
         try:
-            encoding_blob = pickle.dumps(encoding) if encoding is not None else None
+            encoding_blob = encoding_to_blob(encoding) if encoding is not None else None
+            dim = len(encoding_blob) // ENCODING_DTYPE.itemsize if encoding_blob is not None else None
             
-            c.execute('''INSERT INTO students (first_name, last_name, photo_path, encoding)
-                        VALUES (?, ?, ?, ?)''', 
-                     (first_name, last_name, photo_path, encoding_blob))
-            conn.commit()
+            with conn:
+                c = conn.execute('''INSERT INTO students (first_name, last_name, photo_path, encoding, dim, model)
+                            VALUES (?, ?, ?, ?, ?, ?)''', 
+                         (first_name, last_name, photo_path, encoding_blob, dim, model))
             return c.lastrowid
         except:
             return None
-        finally:
-            conn.close()
     
+    def add_students_batch(self, students):
+        """Insère [(prénom, nom, photo, encodage, modèle)] en une transaction, retourne les ids (None si échec)"""
+        conn = self._connection()
+        try:
+            ids = []
+            with conn:
+                for first_name, last_name, photo_path, encoding, model in students:
+                    encoding_blob = encoding_to_blob(encoding) if encoding is not None else None
+                    dim = len(encoding_blob) // ENCODING_DTYPE.itemsize if encoding_blob is not None else None
+                    c = conn.execute('''INSERT INTO students (first_name, last_name, photo_path, encoding, dim, model)
+                                    VALUES (?, ?, ?, ?, ?, ?)''',
+                                 (first_name, last_name, photo_path, encoding_blob, dim, model))
+                    ids.append(c.lastrowid)
+            return ids
+        except Exception as e:
+            print(f"✗ Erreur inscription en masse: {e}")
+            return None
+    
+    def set_student_photos(self, photos):
+        """Enregistre [(student_id, chemin photo)] en une transaction (sans effet sur la galerie)"""
+        conn = self._connection()
+        try:
+            with conn:
+                conn.executemany('UPDATE students SET photo_path = ? WHERE id = ?',
+                                 [(photo_path, student_id) for student_id, photo_path in photos])
+            return True
+        except Exception as e:
+            print(f"✗ Erreur enregistrement des photos: {e}")
+            return False
+
+    def get_stored_encodings(self):
+        """[(id, prénom, nom, encodage brut, dim)] de tous les étudiants ayant un encodage (contrôle/migration)"""
+        return self._connection().execute(
+            'SELECT id, first_name, last_name, encoding, dim FROM students WHERE encoding IS NOT NULL'
+        ).fetchall()
+
     def get_all_students(self):
-        conn = sqlite3.connect(self.db_name)
-        c = conn.cursor()
-        c.execute('SELECT id, first_name, last_name, photo_path FROM students ORDER BY last_name')
-        data = c.fetchall()
-        conn.close()
-        return data
+        return self._connection().execute(
+            'SELECT id, first_name, last_name, photo_path FROM students ORDER BY last_name'
+        ).fetchall()
     
 
-    def get_student_encodings(self):
-        conn = sqlite3.connect(self.db_name)
-        c = conn.cursor()
-        c.execute('SELECT id, first_name, last_name, encoding FROM students WHERE encoding IS NOT NULL')
-        results = c.fetchall()
-        conn.close()
-        
-        encodings = []
-        students_info = []
-        
-        for student_id, first_name, last_name, encoding_blob in results:
-            if encoding_blob:
-                encoding = pickle.loads(encoding_blob)
-                encodings.append(encoding)
-                students_info.append({
-                    'id': student_id,
-                    'name': f"{first_name} {last_name}",
-                })
-        
-        return encodings, students_info
+    def get_student_encodings(self, model=None):
+        """Retourne (matrice (N, D) float32 contiguë, infos étudiants).
+
+        Seule la dimension majoritaire est chargée ; avec `model`, les
+        encodages d'un autre modèle sont exclus (model NULL = inconnu, gardé).
+        """
+        conn = self._connection()
+        where, params = self._encodings_filter(model)
+
+        dims = conn.execute(
+            f'SELECT dim, COUNT(*) FROM students WHERE {where} GROUP BY dim ORDER BY COUNT(*) DESC', params
+        ).fetchall()
+        if not dims:
+            return np.empty((0, 0), dtype=np.float32), []
+
+        dim = dims[0][0]
+        skipped = sum(count for _, count in dims[1:])
+        if skipped:
+            print(f"⚠️ {skipped} encodage(s) ignoré(s) (dimension différente de {dim})")
+
+        results = conn.execute(
+            f'SELECT id, first_name, last_name, encoding FROM students WHERE {where} AND dim = ? ORDER BY id',
+            params + (dim,),
+        ).fetchall()
+
+        # Un seul tampon pour toutes les lignes, lu sans conversion par NumPy
+        matrix = blob_to_encoding(b''.join(row[3] for row in results)).reshape(len(results), dim)
+        students_info = [
+            {'id': student_id, 'name': f"{first_name} {last_name}"}
+            for student_id, first_name, last_name, _ in results
+        ]
+        return matrix, students_info
+    
+
+    def _encodings_filter(self, model=None):
+        """Clause WHERE des encodages chargeables (format valide, modèle compatible)"""
+        where = 'encoding IS NOT NULL AND length(encoding) = dim * 4'
+        params = ()
+        if model is not None:
+            where += ' AND (model = ? OR model IS NULL)'
+            params = (model,)
+        return where, params
+
+    def gallery_fingerprint(self, dim=None, model=None):
+        """Empreinte bon marché de la galerie en base : (nombre d'encodages, version).
+
+        La version est incrémentée par trigger à chaque ligne insérée ou
+        supprimée dans students, et à chaque changement de nom ou d'encodage.
+        """
+        where, params = self._encodings_filter(model)
+        if dim:
+            where += ' AND dim = ?'
+            params += (dim,)
+        return self._connection().execute(
+            f'SELECT COUNT(*), (SELECT version FROM gallery_version WHERE id = 1) FROM students WHERE {where}',
+            params,
+        ).fetchone()
     
 
     # === 🔥 MÉTHODE CORRIGÉE : update_student_encoding ===
-    def update_student_encoding(self, student_id, encoding):
-        conn = sqlite3.connect(self.db_name)
-        c = conn.cursor()
+    def update_student_encoding(self, student_id, encoding, model=None):
+        conn = self._connection()
         try:
-            encoding_blob = pickle.dumps(encoding) if encoding is not None else None
-            c.execute('UPDATE students SET encoding = ? WHERE id = ?', 
-                     (encoding_blob, student_id))
-            conn.commit()
+            encoding_blob = encoding_to_blob(encoding) if encoding is not None else None
+            dim = len(encoding_blob) // ENCODING_DTYPE.itemsize if encoding_blob is not None else None
+            with conn:
+                conn.execute('UPDATE students SET encoding = ?, dim = ?, model = ? WHERE id = ?', 
+                             (encoding_blob, dim, model, student_id))
             print(f"✓ Encodage mis à jour pour étudiant {student_id}")
             return True
         except Exception as e:
             print("Erreur:", e)
             return False
-        finally:
-            conn.close()
-    
+
+    def update_student_encodings_batch(self, updates, model=None):
+        """Met à jour [(student_id, encodage)] en une transaction"""
+        conn = self._connection()
+        try:
+            rows = []
+            for student_id, encoding in updates:
+                encoding_blob = encoding_to_blob(encoding)
+                rows.append((encoding_blob, len(encoding_blob) // ENCODING_DTYPE.itemsize, model, student_id))
+            with conn:
+                conn.executemany('UPDATE students SET encoding = ?, dim = ?, model = ? WHERE id = ?', rows)
+            return True
+        except Exception as e:
+            print(f"✗ Erreur mise à jour des encodages: {e}")
+            return False
+
 
     # === 🔥 MÉTHODE CORRIGÉE : delete_student ===
     def delete_student(self, student_id):
-        conn = sqlite3.connect(self.db_name)
-        c = conn.cursor()
+        conn = self._connection()
 
-        # récupérer photo avant suppression
-        c.execute('SELECT photo_path FROM students WHERE id = ?', (student_id,))
-        result = c.fetchone()
+        with conn:
+            # récupérer photo avant suppression
+            result = conn.execute('SELECT photo_path FROM students WHERE id = ?', (student_id,)).fetchone()
 
-        if not result:
-            conn.close()
-            return False
+            if not result:
+                return False
 
-        photo_path = result[0]
+            photo_path = result[0]
 
-        # supprimer l'étudiant
-        c.execute('DELETE FROM students WHERE id = ?', (student_id,))
-        conn.commit()
-        conn.close()
+            # supprimer l'étudiant
+            conn.execute('DELETE FROM students WHERE id = ?', (student_id,))
 
         # supprimer la photo
         if photo_path and os.path.exists(photo_path):
@@ -200,53 +396,60 @@ class AttendanceDatabase:
         
         start_time = datetime.now().strftime('%H:%M:%S')
         
-        conn = sqlite3.connect(self.db_name)
-        c = conn.cursor()
-        c.execute('INSERT INTO sessions (professor_id, subject, session_date, start_time) VALUES (?, ?, ?, ?)',
-                  (professor_id, subject, session_date, start_time))
-        conn.commit()
-        session_id = c.lastrowid
-        conn.close()
-        return session_id
+        conn = self._connection()
+        with conn:
+            c = conn.execute('INSERT INTO sessions (professor_id, subject, session_date, start_time) VALUES (?, ?, ?, ?)',
+                             (professor_id, subject, session_date, start_time))
+        return c.lastrowid
     
 
     def end_session(self, session_id):
-        conn = sqlite3.connect(self.db_name)
-        c = conn.cursor()
+        conn = self._connection()
         end_time = datetime.now().strftime('%H:%M:%S')
-        c.execute('UPDATE sessions SET end_time = ? WHERE id = ?', (end_time, session_id))
-        conn.commit()
-        conn.close()
+        with conn:
+            conn.execute('UPDATE sessions SET end_time = ? WHERE id = ?', (end_time, session_id))
     
 
     def mark_attendance(self, session_id, student_id):
-        conn = sqlite3.connect(self.db_name)
-        c = conn.cursor()
+        conn = self._connection()
 
         check_in = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
 
         try:
-            c.execute('INSERT OR IGNORE INTO attendance (session_id, student_id, check_in_time) VALUES (?, ?, ?)',
-                      (session_id, student_id, check_in))
-            conn.commit()
+            with conn:
+                conn.execute('INSERT OR IGNORE INTO attendance (session_id, student_id, check_in_time) VALUES (?, ?, ?)',
+                             (session_id, student_id, check_in))
             return True
         except:
             return False
-        finally:
-            conn.close()
     
 
-    def get_session_stats(self, session_id):
-        conn = sqlite3.connect(self.db_name)
-        c = conn.cursor()
-
-        c.execute('SELECT COUNT(*) FROM students')
-        total = c.fetchone()[0]
+    def mark_attendance_batch(self, session_id, records):
+        """Marque plusieurs présences [(student_id, check_in_time)] en une transaction
 
-        c.execute('SELECT COUNT(*) FROM attendance WHERE session_id = ?', (session_id,))
-        present = c.fetchone()[0]
+        Retourne l'ensemble des student_id réellement insérés (les étudiants
+        déjà présents sont ignorés), ou None en cas d'erreur.
+        """
+        conn = self._connection()
+        inserted = set()
+        try:
+            with conn:
+                for student_id, check_in in records:
+                    cursor = conn.execute('INSERT OR IGNORE INTO attendance (session_id, student_id, check_in_time) VALUES (?, ?, ?)',
+                                          (session_id, student_id, check_in))
+                    if cursor.rowcount == 1:
+                        inserted.add(student_id)
+            return inserted
+        except Exception as e:
+            print(f"✗ Erreur enregistrement présences: {e}")
+            return None
+    
 
-        conn.close()
+    def get_session_stats(self, session_id):
+        total, present = self._connection().execute(
+            '''SELECT (SELECT COUNT(*) FROM students),
+                      (SELECT COUNT(*) FROM attendance WHERE session_id = ?)''', (session_id,)
+        ).fetchone()
 
         return {
             "total": total,
@@ -257,47 +460,76 @@ class AttendanceDatabase:
 
 
 
-    def export_attendance_to_csv(self, session_id: int, reports_dir="reports"):
-        os.makedirs(reports_dir, exist_ok=True)
-        conn = sqlite3.connect(self.db_name)
-        c = conn.cursor()
+    def get_session_attendance(self, session_id):
+        """Présences d'une séance par ordre d'arrivée (index couvrant, sans tri)"""
+        rows = self._connection().execute(
+            '''SELECT student_id, check_in_time, status
+               FROM attendance
+               WHERE session_id = ?
+               ORDER BY check_in_time''', (session_id,)
+        ).fetchall()
+        return [
+            {"student_id": student_id, "check_in_time": check_in_time, "status": status}
+            for student_id, check_in_time, status in rows
+        ]
 
-    # Récupérer le sujet et la date de la séance
-        c.execute("SELECT subject, session_date FROM sessions WHERE id = ?", (session_id,))
-        session = c.fetchone()
-        if not session:
-            conn.close()
-            raise ValueError(f"Session {session_id} introuvable")
-        subject, session_date = session
 
-    # Récupérer tous les étudiants
-        c.execute("SELECT id, first_name, last_name FROM students ORDER BY last_name")
-        students = c.fetchall()
+    def get_session(self, session_id):
+        """Retourne (sujet, date) d'une séance, ou None"""
+        return self._connection().execute(
+            "SELECT subject, session_date FROM sessions WHERE id = ?", (session_id,)
+        ).fetchone()
 
-    # Récupérer les présences
-        c.execute("SELECT student_id, check_in_time, status FROM attendance WHERE session_id = ?", (session_id,))
-        attendance_records = c.fetchall()
-        attendance_dict = {record[0]: {"check_in_time": record[1], "status": record[2]} for record in attendance_records}
+    def report_filename(self, session_id, subject, session_date):
+        """Nom du fichier basé sur date + sujet + ID"""
+        return f"{session_date}_{subject.replace(' ', '_')}_session{session_id}.csv"
 
-    # Nom du fichier basé sur date + sujet + ID
-        filename = os.path.join(reports_dir, f"{session_date}_{subject.replace(' ', '_')}_session{session_id}.csv")
+    def iter_attendance_csv(self, session_id, subject, chunk_rows=500):
+        """Génère le rapport CSV d'une séance par morceaux de `chunk_rows` lignes.
 
-    # Écrire le CSV
-        with open(filename, "w", newline="", encoding="utf-8") as f:
-            writer = csv.writer(f)
+        Une seule requête LEFT JOIN parcourue au curseur : la mémoire ne
+        dépend pas du nombre d'étudiants. Connexion dédiée, car le
+        générateur peut être repris depuis plusieurs threads (StreamingResponse).
+        """
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                '''SELECT s.id, s.first_name, s.last_name,
+                          COALESCE(a.check_in_time, ''), COALESCE(a.status, 'absent')
+                   FROM students s
+                   LEFT JOIN attendance a ON a.student_id = s.id AND a.session_id = ?
+                   ORDER BY s.last_name''', (session_id,)
+            )
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
             writer.writerow(["Student ID", "First Name", "Last Name", "Check-in Time", "Status", "Session Name"])
+            while True:
+                rows = cursor.fetchmany(chunk_rows)
+                if not rows:
+                    break
+                writer.writerows(row + (subject,) for row in rows)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            if buffer.tell():
+                yield buffer.getvalue()  # en-tête seul (aucun étudiant)
+        finally:
+            conn.close()
 
-            for student_id, first_name, last_name in students:
-                record = attendance_dict.get(student_id, {})
-                check_in_time = record.get("check_in_time", "")
-                status = record.get("status", "absent")
-                writer.writerow([student_id, first_name, last_name, check_in_time, status, subject])
-
-        conn.close()
-        print("CSV généré:", filename)
+    def export_attendance_to_csv(self, session_id: int, reports_dir="reports"):
+        session = self.get_session(session_id)
+        if not session:
+            raise ValueError(f"Session {session_id} introuvable")
+        subject, session_date = session
 
-        return filename
+        os.makedirs(reports_dir, exist_ok=True)
+        filename = os.path.join(reports_dir, self.report_filename(session_id, subject, session_date))
 
+        # Écrire le CSV au fil de la requête
+        with open(filename, "w", newline="", encoding="utf-8") as f:
+            for chunk in self.iter_attendance_csv(session_id, subject):
+                f.write(chunk)
 
-    
+        print("CSV généré:", filename)
 
+        return filename
@@ -0,0 +1,152 @@
+"""
+Backends de détection de visages interchangeables pour FaceDetector
+
+- "haar" : cascade de Haar (comportement historique)
+- "lbp"  : cascade LBP, plus rapide mais un peu moins précise (fichier
+           lbpcascade_frontalface_improved.xml à fournir, voir LBPCascadeBackend)
+- "ssd"  : réseau SSD ResNet-10 (deploy.prototxt + poids caffemodel)
+
+Chaque backend retourne des boîtes (x, y, w, h) et mesure sa propre
+latence par image.
+"""
+
+import os
+import time
+
+import cv2
+import numpy as np
+
+
+class DetectorBackend:
+    name = "base"
+
+    def __init__(self):
+        self.frames = 0
+        self.total_ms = 0.0
+        self.last_latency_ms = 0.0
+
+    def detect(self, frame, min_size=None):
+        """Détecte les visages d'une image BGR, retourne un tableau (N, 4) de (x, y, w, h)"""
+        start = time.perf_counter()
+        boxes = self._detect(frame, min_size)
+        self.last_latency_ms = (time.perf_counter() - start) * 1000
+        self.frames += 1
+        self.total_ms += self.last_latency_ms
+        return np.asarray(boxes, dtype=np.int32).reshape(-1, 4)
+
+    def _detect(self, frame, min_size):
+        raise NotImplementedError
+
+    def latency_stats(self):
+        return {
+            "backend": self.name,
+            "frames": self.frames,
+            "last_ms": round(self.last_latency_ms, 2),
+            "avg_ms": round(self.total_ms / self.frames, 2) if self.frames else 0.0,
+        }
+
+
+class HaarCascadeBackend(DetectorBackend):
+    name = "haar"
+    default_cascade = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+
+    def __init__(self, cascade_path=None, cascade=None, scale_factor=1.1, min_neighbors=5, min_size=(30, 30)):
+        super().__init__()
+        if cascade is None:
+            cascade_path = cascade_path or self.default_cascade
+            if not os.path.exists(cascade_path):
+                raise FileNotFoundError(f"Cascade introuvable: {cascade_path}")
+            cascade = cv2.CascadeClassifier(cascade_path)
+            if cascade.empty():
+                raise ValueError(f"Cascade invalide: {cascade_path}")
+        self.cascade = cascade
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_size = tuple(min_size)
+
+    def _detect(self, frame, min_size):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        return self.cascade.detectMultiScale(
+            gray,
+            scaleFactor=self.scale_factor,
+            minNeighbors=self.min_neighbors,
+            minSize=tuple(min_size or self.min_size),
+            flags=cv2.CASCADE_SCALE_IMAGE
+        )
+
+
+class LBPCascadeBackend(HaarCascadeBackend):
+    """Cascade LBP : fournie avec les sources OpenCV (data/lbpcascades) mais absente des wheels pip.
+
+    Sans `cascade_path`, le fichier est cherché à côté de ce module (comme
+    deploy.prototxt), puis dans les données d'OpenCV ; s'il est introuvable,
+    la construction échoue (FileNotFoundError) au lieu de basculer sur Haar.
+    """
+    name = "lbp"
+    cascade_file = "lbpcascade_frontalface_improved.xml"
+
+    def __init__(self, cascade_path=None, cascade=None, **options):
+        if cascade is None and cascade_path is None:
+            cascade_path = self.find_cascade()
+        super().__init__(cascade_path=cascade_path, cascade=cascade, **options)
+
+    @classmethod
+    def find_cascade(cls):
+        opencv_data = cv2.data.haarcascades
+        candidates = [
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), cls.cascade_file),
+            os.path.join(opencv_data, cls.cascade_file),
+            os.path.join(os.path.dirname(os.path.normpath(opencv_data)), "lbpcascades", cls.cascade_file),
+        ]
+        for path in candidates:
+            if os.path.exists(path):
+                return path
+        raise FileNotFoundError(
+            f"Cascade LBP introuvable ({cls.cascade_file}) ; cherchée dans : {', '.join(candidates)}. "
+            "Copiez-la depuis opencv/data/lbpcascades ou passez detector_options={'cascade_path': ...}"
+        )
+
+
+class SSDDetectorBackend(DetectorBackend):
+    name = "ssd"
+
+    def __init__(self, prototxt="deploy.prototxt", weights="res10_300x300_ssd_iter_140000.caffemodel",
+                 confidence_threshold=0.5, input_size=(300, 300), min_size=(30, 30)):
+        super().__init__()
+        for path in (prototxt, weights):
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Modèle SSD introuvable: {path}")
+        self.net = cv2.dnn.readNetFromCaffe(prototxt, weights)
+        self.confidence_threshold = confidence_threshold
+        self.input_size = tuple(input_size)
+        self.min_size = tuple(min_size)
+
+    def _detect(self, frame, min_size):
+        h, w = frame.shape[:2]
+        blob = cv2.dnn.blobFromImage(frame, 1.0, self.input_size, (104.0, 177.0, 123.0), swapRB=False, crop=False)
+        self.net.setInput(blob)
+        detections = self.net.forward().reshape(-1, 7)
+
+        detections = detections[detections[:, 2] >= self.confidence_threshold]
+        corners = np.clip(detections[:, 3:7], 0.0, 1.0) * np.array([w, h, w, h], dtype=np.float32)
+        x1, y1, x2, y2 = np.round(corners).astype(np.int32).T
+        boxes = np.stack([x1, y1, x2 - x1, y2 - y1], axis=1)
+
+        min_w, min_h = min_size or self.min_size
+        return boxes[(boxes[:, 2] >= min_w) & (boxes[:, 3] >= min_h)]
+
+
+DETECTOR_BACKENDS = {
+    "haar": HaarCascadeBackend,
+    "lbp": LBPCascadeBackend,
+    "ssd": SSDDetectorBackend,
+}
+
+
+def create_detector_backend(name="haar", **options):
+    """Instancie un backend par son nom ("haar", "lbp" ou "ssd")"""
+    try:
+        backend_cls = DETECTOR_BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Backend inconnu: {name} (choix: {', '.join(DETECTOR_BACKENDS)})")
+    return backend_cls(**options)
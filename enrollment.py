@@ -0,0 +1,232 @@
+"""
+Inscription en masse des étudiants
+
+Les images (fichiers envoyés ou archive zip) sont décodées, détectées et
+encodées dans un pool de processus : chaque processus garde son propre
+FaceDetector et encode les visages d'un lot d'images en une seule passe.
+Les étudiants valides sont ensuite insérés en une transaction et la
+galerie du détecteur n'est mise à jour qu'une fois.
+
+Les noms viennent d'un manifeste (CSV `fichier,prénom,nom` ou JSON
+`{"fichier": {"first_name": ..., "last_name": ...}}`), ou à défaut du
+nom de fichier `Prénom_Nom.jpg`.
+"""
+
+import atexit
+import csv
+import io
+import json
+import multiprocessing as mp
+import os
+import re
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import cv2
+import numpy as np
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+MANIFEST_NAMES = ("manifest.csv", "manifest.json")
+
+_worker_detector = None
+
+
+# === CÔTÉ PROCESSUS DU POOL ===
+def _init_worker(detector_options):
+    global _worker_detector
+    from face_detector import FaceDetector
+    _worker_detector = FaceDetector(**detector_options)
+
+
+def _encode_chunk(items):
+    """Traite un lot [(index, octets)] → [(index, encodage ou None, erreur ou None)]"""
+    detector = _worker_detector
+    results = []
+    crops, owners = [], []
+    for index, data in items:
+        frame = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        if frame is None:
+            results.append((index, None, "Impossible de lire l'image"))
+            continue
+        boxes = detector._detect_boxes(frame)
+        if len(boxes) == 0:
+            results.append((index, None, "Aucun visage détecté"))
+            continue
+        if len(boxes) > 1:
+            results.append((index, None, f"{len(boxes)} visages détectés (1 seul requis)"))
+            continue
+        x, y, w, h = (int(v) for v in boxes[0])
+        crops.append(frame[y:y + h, x:x + w])
+        owners.append(index)
+
+    # Un seul appel à l'encodeur pour tous les visages du lot
+    encodings = detector._extract_face_encodings(crops) if crops else []
+    for index, encoding in zip(owners, encodings):
+        results.append((index, None, "Erreur extraction encodage") if encoding is None else (index, encoding, None))
+    return results
+
+
+# === ENTRÉES ===
+def collect_images(uploads):
+    """Développe les archives zip : [(nom, octets)] → (images [(nom, octets)], texte du manifeste ou None)"""
+    images = []
+    manifest = None
+    for filename, data in uploads:
+        if filename.lower().endswith(".zip"):
+            with zipfile.ZipFile(io.BytesIO(data)) as archive:
+                for info in archive.infolist():
+                    name = os.path.basename(info.filename)
+                    if info.is_dir() or not name or info.filename.startswith("__MACOSX/"):
+                        continue
+                    if name.lower() in MANIFEST_NAMES:
+                        manifest = archive.read(info).decode("utf-8-sig")
+                    elif name.lower().endswith(IMAGE_EXTENSIONS):
+                        images.append((name, archive.read(info)))
+        elif os.path.basename(filename).lower() in MANIFEST_NAMES:
+            manifest = data.decode("utf-8-sig")
+        else:
+            images.append((os.path.basename(filename), data))
+    return images, manifest
+
+
+def parse_manifest(text):
+    """Manifeste CSV ou JSON → {nom de fichier: (prénom, nom)}"""
+    if not text or not text.strip():
+        return {}
+
+    stripped = text.strip()
+    if stripped[0] in "[{":
+        data = json.loads(stripped)
+        if isinstance(data, dict):
+            data = [{"file": name, **fields} for name, fields in data.items()]
+        return {entry["file"]: (entry["first_name"], entry["last_name"]) for entry in data}
+
+    rows = [row for row in csv.reader(io.StringIO(stripped)) if row and any(cell.strip() for cell in row)]
+    if rows and rows[0][0].strip().lower() in ("file", "fichier", "filename"):
+        rows = rows[1:]  # ligne d'en-tête
+    return {row[0].strip(): (row[1].strip(), row[2].strip()) for row in rows if len(row) >= 3}
+
+
+def names_from_filename(filename):
+    """'Prénom_Nom.jpg' → ('Prénom', 'Nom'), ou None"""
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    if "_" not in stem:
+        return None
+    first_name, last_name = stem.split("_", 1)
+    first_name, last_name = first_name.strip(), last_name.replace("_", " ").strip()
+    return (first_name, last_name) if first_name and last_name else None
+
+
+def photo_filename(student_id, first_name, last_name, upload_name=""):
+    """Nom de fichier sûr et unique : id de l'étudiant, sans séparateur de chemin ni '..' venus du manifeste"""
+    stem = re.sub(r"[^\w\-]+", "_", f"{first_name.strip()}_{last_name.strip()}").strip("._")
+    ext = os.path.splitext(upload_name)[1].lower()
+    return f"{student_id}_{stem or 'etudiant'}{ext if ext in IMAGE_EXTENSIONS else '.jpg'}"
+
+
+# === ORCHESTRATION ===
+class BulkEnroller:
+    def __init__(self, database, detector, detector_options=None, workers=None, chunk_size=8,
+                 photos_dir="students_photos", start_method="spawn"):
+        self.database = database
+        self.detector = detector
+        self.detector_options = detector_options or {}
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self.chunk_size = chunk_size
+        self.photos_dir = photos_dir
+        self._ctx = mp.get_context(start_method)
+        self._pool = None
+        atexit.register(self.shutdown)
+
+    def _get_pool(self):
+        # Pool conservé entre les requêtes : le chargement des modèles n'est payé qu'une fois
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=self._ctx,
+                initializer=_init_worker, initargs=(self.detector_options,),
+            )
+        return self._pool
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def enroll(self, images, manifest=None):
+        """Inscrit un lot d'images [(nom de fichier, octets)], retourne le rapport par image"""
+        start = time.perf_counter()
+        names = parse_manifest(manifest)
+        report = [{"file": filename, "status": "error"} for filename, _ in images]
+
+        # Noms des étudiants
+        pending = []
+        name_of = {}
+        for index, (filename, data) in enumerate(images):
+            name = names.get(filename) or names.get(os.path.splitext(filename)[0]) or names_from_filename(filename)
+            if name is None:
+                report[index]["error"] = "Nom introuvable (manifeste ou Prénom_Nom.jpg)"
+                continue
+            first_name, last_name = name
+            name_of[index] = name
+            report[index]["name"] = f"{first_name} {last_name}"
+            pending.append((index, data))
+
+        # Décodage, détection et encodage en parallèle
+        encodings = {}
+        if pending:
+            chunks = [pending[i:i + self.chunk_size] for i in range(0, len(pending), self.chunk_size)]
+            try:
+                for results in self._get_pool().map(_encode_chunk, chunks):
+                    for index, encoding, error in results:
+                        if encoding is None:
+                            report[index]["error"] = error
+                        else:
+                            encodings[index] = encoding
+            except BrokenProcessPool:
+                self._pool = None  # recréé à la prochaine requête
+                raise
+
+        # Une transaction pour toutes les inscriptions réussies
+        order = sorted(encodings)
+        rows = []
+        for index in order:
+            first_name, last_name = name_of[index]
+            rows.append((first_name, last_name, None, encodings[index], self.detector.encoding_model))
+        ids = self.database.add_students_batch(rows) if rows else []
+        if ids is None:
+            for index in order:
+                report[index]["error"] = "Erreur base de données"
+            ids, order = [], []
+
+        # Photos d'origine (octets reçus) écrites seulement pour les étudiants insérés, nommées par leur id
+        if ids:
+            os.makedirs(self.photos_dir, exist_ok=True)
+        students = []
+        photos = []
+        for index, student_id in zip(order, ids):
+            first_name, last_name = name_of[index]
+            filename, data = images[index]
+            photo_path = os.path.join(self.photos_dir, photo_filename(student_id, first_name, last_name, filename))
+            with open(photo_path, "wb") as f:
+                f.write(data)
+            photos.append((student_id, photo_path))
+            report[index].update(status="ok", id=student_id, photo_path=photo_path)
+            students.append({"id": student_id, "name": report[index]["name"]})
+        if photos:
+            self.database.set_student_photos(photos)
+
+        # Une seule mise à jour de la galerie
+        if students:
+            self.detector.add_known_faces(students, [encodings[i] for i in order], self.database)
+
+        elapsed = time.perf_counter() - start
+        enrolled = len(students)
+        return {
+            "enrolled": enrolled,
+            "failed": len(images) - enrolled,
+            "seconds": round(elapsed, 2),
+            "images_per_sec": round(len(images) / elapsed, 1) if elapsed > 0 else 0.0,
+            "results": report,
+        }
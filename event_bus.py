@@ -0,0 +1,167 @@
+"""
+Bus d'événements en mémoire, un canal par séance (flux SSE /sessions/{id}/events)
+
+- Les enregistreurs de présences publient depuis leur thread d'écriture ;
+  chaque événement reçoit un id croissant dans la séance et est sérialisé
+  une seule fois, quel que soit le nombre d'abonnés.
+- Un abonné (connexion SSE) attend sans rien interroger : il est réveillé
+  par la publication, une séance sans activité ne coûte qu'un keepalive.
+- Les derniers événements sont conservés : un client qui se reconnecte
+  avec Last-Event-ID reçoit ce qu'il a manqué, ou un événement `reset`
+  (relire l'état complet) si l'historique ne remonte pas assez loin.
+- Le canal d'une séance est supprimé quand elle est terminée (`end_session`)
+  et que son dernier abonné est parti.
+- Les processus caméra (SessionManager) publient via un `QueueEventPublisher`
+  ; le processus principal relaie leurs événements sur ce bus.
+"""
+
+import asyncio
+import json
+import threading
+from collections import deque
+
+
+class SessionChannel:
+    def __init__(self, history, on_idle=None):
+        self.last_id = 0
+        self.ended = False
+        self._on_idle = on_idle  # appelé quand le canal peut être supprimé
+        self._events = deque(maxlen=history)  # (id, type, données JSON)
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def publish(self, event_type, data):
+        payload = json.dumps(data, ensure_ascii=False)
+        with self._lock:
+            self.last_id += 1
+            self._events.append((self.last_id, event_type, payload))
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription._notify()
+        return self.last_id
+
+    def since(self, cursor):
+        """Événements d'id > cursor ; un seul `reset` si des événements ont été perdus"""
+        with self._lock:
+            if cursor == self.last_id:
+                return []
+            oldest = self._events[0][0] if self._events else self.last_id + 1
+            if cursor > self.last_id or cursor < oldest - 1:
+                # id inconnu (redémarrage du serveur) ou trop ancien
+                return [(self.last_id, "reset", "{}")]
+            return [event for event in self._events if event[0] > cursor]
+
+    def idle(self):
+        """Sans abonné, et séance terminée ou sans historique à conserver"""
+        return not self._subscribers and (self.ended or self.last_id == 0)
+
+
+class Subscription:
+    def __init__(self, channel, cursor):
+        self.channel = channel
+        self.cursor = cursor
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+
+    def _notify(self):
+        try:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        except RuntimeError:
+            pass  # boucle fermée
+
+    async def next_events(self, timeout=15.0):
+        """Attend les prochains événements ; [] si rien n'est arrivé avant `timeout`"""
+        events = self.channel.since(self.cursor)
+        if not events:
+            self._wakeup.clear()
+            events = self.channel.since(self.cursor)  # publication entre les deux lectures
+            if not events:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    return []
+                events = self.channel.since(self.cursor)
+        if events:
+            self.cursor = events[-1][0]
+        return events
+
+    def close(self):
+        with self.channel._lock:
+            self.channel._subscribers.discard(self)
+        if self.channel._on_idle is not None:
+            self.channel._on_idle(self.channel)
+
+
+class _CheckinPublisher:
+    def publish_checkins(self, database, session_id, records):
+        """Publie les présences écrites [(étudiant, confiance, heure)] puis les compteurs à jour"""
+        for student, confidence, check_in in records:
+            self.publish(session_id, "checkin", {
+                "student_id": student["id"],
+                "student_name": student.get("name"),
+                "confidence": confidence,
+                "check_in_time": check_in,
+            })
+        self.publish(session_id, "stats", database.get_session_stats(session_id))
+
+
+class EventBus(_CheckinPublisher):
+    def __init__(self, history=500):
+        self.history = history
+        self._channels = {}
+        self._lock = threading.Lock()
+
+    def channel(self, session_id):
+        with self._lock:
+            return self._get_or_create(session_id)
+
+    def _get_or_create(self, session_id):
+        channel = self._channels.get(session_id)
+        if channel is None:
+            channel = self._channels[session_id] = SessionChannel(
+                self.history, on_idle=lambda c, sid=session_id: self._drop_if_idle(sid, c))
+        return channel
+
+    def _drop_if_idle(self, session_id, channel):
+        with self._lock:
+            with channel._lock:
+                if self._channels.get(session_id) is channel and channel.idle():
+                    del self._channels[session_id]
+
+    def end_session(self, session_id):
+        """Séance terminée : le canal est supprimé dès qu'il n'a plus d'abonné"""
+        with self._lock:
+            channel = self._channels.get(session_id)
+        if channel is not None:
+            channel.ended = True
+            self._drop_if_idle(session_id, channel)
+
+    def publish(self, session_id, event_type, data):
+        return self.channel(session_id).publish(event_type, data)
+
+    def subscribe(self, session_id, last_event_id=None):
+        """Abonnement depuis la boucle asyncio ; sans last_event_id, seuls les nouveaux événements"""
+        with self._lock:  # pas de suppression du canal entre sa création et l'abonnement
+            channel = self._get_or_create(session_id)
+            with channel._lock:
+                subscription = Subscription(channel, channel.last_id if last_event_id is None else last_event_id)
+                channel._subscribers.add(subscription)
+        return subscription
+
+    def forward(self, event_queue):
+        """Relaie sur ce bus les événements d'un QueueEventPublisher jusqu'à None (thread dédié)"""
+        while True:
+            event = event_queue.get()
+            if event is None:
+                return
+            self.publish(*event)
+
+
+class QueueEventPublisher(_CheckinPublisher):
+    """Côté processus caméra : transmet les événements au bus du processus principal"""
+
+    def __init__(self, event_queue):
+        self.event_queue = event_queue
+
+    def publish(self, session_id, event_type, data):
+        self.event_queue.put((session_id, event_type, data))
@@ -2,26 +2,73 @@ import cv2
 import numpy as np
 import os
 from datetime import datetime
-from threading import Thread
+from threading import RLock, Thread
 import time
 
+from ann_index import IVFIndex
+from detector_backends import HaarCascadeBackend, create_detector_backend
+from attendance_pipeline import AttendancePipeline
+from gallery import FaceGallery, load_snapshot, save_snapshot
+from lbp_features import lbp_histogram
+
 
 class FaceDetector:
-    def __init__(self, tolerance=0.55):
+    def __init__(self, tolerance=0.55, use_ann=False, ann_nprobe=8, ann_exact_threshold=2000,
+                 max_batch_size=32, detector_backend="haar", detector_options=None,
+                 detection_width=None, min_face_size=None, track_faces=True, tracker_options=None,
+                 gallery_snapshot=None):
         self.tolerance = tolerance
-        self.known_encodings = []
-        self.known_students = []
+        self.gallery = FaceGallery()
+
+        # Mises à jour de la galerie : copie puis remplacement de self.gallery en une affectation
+        self._gallery_lock = RLock()
+        self._gallery_version = None  # version de la base que la galerie est censée refléter
+
+        # Préfixe de l'instantané disque de la galerie (None = toujours relire la base)
+        self.gallery_snapshot = gallery_snapshot
+
+        # Index approximatif (IVF) pour les grandes galeries, exact en dessous du seuil
+        self.use_ann = use_ann
+        self.ann_index = IVFIndex(nprobe=ann_nprobe, exact_threshold=ann_exact_threshold)
+        self._ann_dirty = True
+
+        # Nombre maximal de visages par passe réseau (borne la mémoire du blob)
+        self.max_batch_size = max_batch_size
+        self.encoder_stats = {"calls": 0, "faces": 0, "seconds": 0.0}
+
         self.marked_students = set()
         self.running = False
         self.stats = None
+
+        # Session de présence locale en cours (start_attendance_session)
+        self.session_id = None
+        self.session_source = None
+        self.session_headless = False
+        self.session_error = None
+        self._session_thread = None
         
         # Détecteur Haar Cascade d'OpenCV
         cascade_path = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
         self.face_cascade = cv2.CascadeClassifier(cascade_path)
+
+        # Backend de détection utilisé par detect_faces_in_frame
+        self.detector_backend = self._load_detector_backend(detector_backend, detector_options or {})
+
+        # Détection sur image réduite : largeur de travail et plus petit visage recherché (pixels).
+        # Si aucun des deux n'est défini, la détection se fait en pleine résolution.
+        self.detection_width = detection_width
+        self.min_face_size = min_face_size
+
+        # Suivi des visages dans la boucle de présence (évite de ré-encoder les visages déjà identifiés)
+        self.track_faces = track_faces
+        self.tracker_options = tracker_options or {}
+        self.tracker = None
+        self.pipeline = None
         
         # Charger le modèle de reconnaissance faciale DNN d'OpenCV
         # Utilise le modèle ResNet pour les embeddings
         self.face_recognizer = None
+        self.encoding_model = "hist-lbp"  # identifiant stocké avec chaque encodage en base
         self._load_face_recognition_model()
 
     def _load_face_recognition_model(self):
@@ -33,6 +80,7 @@ class FaceDetector:
             
             if os.path.exists(model_path):
                 self.face_recognizer = cv2.dnn.readNetFromTorch(model_path)
+                self.encoding_model = "openface-nn4.small2.v1"
                 print("✓ Modèle OpenFace chargé")
             else:
                 print("⚠️ Modèle OpenFace non trouvé, utilisation de comparaison d'histogrammes")
@@ -41,159 +89,349 @@ class FaceDetector:
             print(f"⚠️ Erreur chargement modèle: {e}, utilisation de comparaison d'histogrammes")
             self.face_recognizer = None
 
+    def _load_detector_backend(self, name, options):
+        """Instancie le backend de détection
+
+        Nom, options ou fichiers de modèle invalides lèvent une erreur ; seul
+        un modèle qu'OpenCV ne sait pas charger (cv2.error) replie sur Haar.
+        """
+        if name == "haar":
+            return HaarCascadeBackend(cascade=self.face_cascade, **options)
+        try:
+            backend = create_detector_backend(name, **options)
+        except cv2.error as e:
+            print(f"⚠️ Détecteur '{name}' non chargé par OpenCV ({e}), utilisation de Haar Cascade")
+            return HaarCascadeBackend(cascade=self.face_cascade)
+        print(f"✓ Détecteur de visages: {name}")
+        return backend
+
+    @property
+    def known_encodings(self):
+        """Matrice (N, D) float32 des encodages connus"""
+        return self.gallery.matrix
+
+    @property
+    def known_students(self):
+        return self.gallery.students
+
     def load_encodings_from_database(self, database):
         """Charge les encodages depuis la base de données"""
-        self.known_encodings, self.known_students = database.get_student_encodings()
-        
-        # Convertir les encodages en numpy arrays
-        if self.known_encodings and len(self.known_encodings) > 0:
-            if isinstance(self.known_encodings[0], (list, tuple)):
-                self.known_encodings = [np.array(enc, dtype=np.float64) for enc in self.known_encodings]
-        
-        print(f"✓ {len(self.known_encodings)} encodage(s) chargé(s)")
+        with self._gallery_lock:
+            # Empreinte lue avant les données : une écriture concurrente forcera un rechargement
+            fingerprint = database.gallery_fingerprint(model=self.encoding_model)
+            version = fingerprint[1]
+            gallery = None
+            if self.gallery_snapshot:
+                gallery = load_snapshot(self.gallery_snapshot, fingerprint, self.encoding_model)
+            if gallery is None:
+                encodings, students = database.get_student_encodings(model=self.encoding_model)
+                gallery = FaceGallery()
+                gallery.load(encodings, students)
+                if self.gallery_snapshot:
+                    try:
+                        save_snapshot(gallery, self.gallery_snapshot, fingerprint, self.encoding_model)
+                    except OSError as e:
+                        print(f"⚠️ Instantané de la galerie non écrit: {e}")
+            self.gallery = gallery
+            self._gallery_version = version
+            self._ann_dirty = True
+            if self.use_ann:
+                self._ensure_ann_index()
+        print(f"✓ {len(self.gallery)} encodage(s) chargé(s)")
+
+    # === MISES À JOUR INCRÉMENTALES DE LA GALERIE ===
+    def add_known_faces(self, students, encodings, database=None):
+        """Ajoute (ou remplace) des visages dans la galerie sans relire la base.
+
+        À appeler après l'écriture correspondante en base (une ligne par
+        étudiant) ; avec `database`, vérifie ensuite la synchronisation.
+        """
+        with self._gallery_lock:
+            try:
+                gallery = self.gallery.with_faces(students, encodings)
+            except ValueError as e:
+                print(f"⚠️ Encodage(s) non ajouté(s) à la galerie: {e}")
+            else:
+                if not self._ann_dirty:
+                    self.ann_index = self.ann_index.with_faces(encodings, [s["id"] for s in students])
+                self.gallery = gallery
+            self._expect_changes(len(students))
+        if database is not None:
+            self.sync_gallery(database)
+
+    def update_known_face(self, student, encoding, database=None):
+        """Remplace l'encodage (et le nom) d'un étudiant déjà connu"""
+        self.add_known_faces([student], [encoding], database)
+
+    def remove_known_faces(self, student_ids, database=None):
+        """Retire des étudiants de la galerie (après leur suppression en base)"""
+        student_ids = list(student_ids)
+        with self._gallery_lock:
+            if not self._ann_dirty:
+                self.ann_index = self.ann_index.without(student_ids)
+            self.gallery = self.gallery.without(student_ids)
+            self._expect_changes(len(student_ids))
+        if database is not None:
+            self.sync_gallery(database)
+
+    def _expect_changes(self, count):
+        if self._gallery_version is not None:
+            self._gallery_version += count
+
+    def sync_gallery(self, database):
+        """Compare l'empreinte de la base à la galerie, recharge tout en cas d'écart.
+
+        Retourne True si un rechargement complet a eu lieu.
+        """
+        with self._gallery_lock:
+            expected = (len(self.gallery), self._gallery_version)
+            if database.gallery_fingerprint(self.gallery.dim, self.encoding_model) == expected:
+                return False
+            if self._gallery_version is not None:
+                print("ℹ️ Galerie désynchronisée avec la base, rechargement complet")
+            self.load_encodings_from_database(database)
+            return True
+
+    def _ensure_ann_index(self):
+        """(Re)construit l'index ANN si la galerie a changé
+
+        Le nouvel index est construit à part puis publié d'une seule
+        affectation : une recherche concurrente voit l'ancien ou le nouveau.
+        """
+        if self._ann_dirty:
+            with self._gallery_lock:
+                if self._ann_dirty:
+                    index = self.ann_index.empty_like()
+                    index.build(self.gallery.matrix, self.gallery.ids)
+                    self.ann_index = index
+                    self._ann_dirty = False
+        return self.ann_index
 
     def _extract_face_encoding(self, face_image):
         """Extrait l'encodage d'un visage avec OpenCV DNN ou histogramme"""
-        if face_image.size == 0 or face_image.shape[0] < 20 or face_image.shape[1] < 20:
-            return None
-        
-        try:
-            if self.face_recognizer is not None:
-                # Utiliser le modèle OpenFace
-                blob = cv2.dnn.blobFromImage(face_image, 1.0/255, (96, 96), (0, 0, 0), swapRB=True, crop=False)
-                self.face_recognizer.setInput(blob)
-                encoding = self.face_recognizer.forward()
-                return encoding.flatten()
-            else:
-                # Fallback: utiliser des features d'histogramme
-                gray = cv2.cvtColor(face_image, cv2.COLOR_BGR2GRAY) if len(face_image.shape) == 3 else face_image
-                resized = cv2.resize(gray, (100, 100))
-                
-                # Créer un vecteur de features combiné
-                hist = cv2.calcHist([resized], [0], None, [256], [0, 256]).flatten()
-                hist = hist / (hist.sum() + 1e-7)  # Normalisation
-                
-                # Ajouter des features LBP (Local Binary Patterns)
-                lbp = self._compute_lbp(resized)
-                
-                # Combiner les features
-                encoding = np.concatenate([hist, lbp])
-                return encoding
-        except Exception as e:
-            print(f"⚠️ Erreur extraction encoding: {e}")
-            return None
+        return self._extract_face_encodings([face_image])[0]
+
+    def _extract_face_encodings(self, face_images):
+        """Extrait les encodages de plusieurs visages en une seule passe.
+
+        Retourne une liste alignée sur face_images (None pour les visages
+        trop petits ou en erreur).
+        """
+        encodings = [None] * len(face_images)
+        valid = [
+            i for i, img in enumerate(face_images)
+            if img.size != 0 and img.shape[0] >= 20 and img.shape[1] >= 20
+        ]
+        if not valid:
+            return encodings
+
+        start = time.perf_counter()
+        for offset in range(0, len(valid), self.max_batch_size):
+            chunk = valid[offset:offset + self.max_batch_size]
+            try:
+                batch = self._encode_batch([face_images[i] for i in chunk])
+                for i, encoding in zip(chunk, batch):
+                    encodings[i] = encoding
+            except Exception as e:
+                print(f"⚠️ Erreur extraction encoding: {e}")
+
+        self.encoder_stats["calls"] += 1
+        self.encoder_stats["faces"] += len(valid)
+        self.encoder_stats["seconds"] += time.perf_counter() - start
+        return encodings
+
+    def _encode_batch(self, face_images):
+        """Encode un lot de visages valides, retourne un tableau (N, D)"""
+        if self.face_recognizer is not None:
+            # Utiliser le modèle OpenFace : un seul blob (N, 3, 96, 96)
+            blob = cv2.dnn.blobFromImages(face_images, 1.0/255, (96, 96), (0, 0, 0), swapRB=True, crop=False)
+            self.face_recognizer.setInput(blob)
+            return self.face_recognizer.forward().reshape(len(face_images), -1)
+
+        # Fallback: utiliser des features d'histogramme
+        resized = np.stack([
+            cv2.resize(cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if len(img.shape) == 3 else img, (100, 100))
+            for img in face_images
+        ])
+
+        # Créer un vecteur de features combiné
+        hists = []
+        for gray in resized:
+            hist = cv2.calcHist([gray], [0], None, [256], [0, 256]).flatten()
+            hists.append(hist / (hist.sum() + 1e-7))  # Normalisation
+
+        # Ajouter des features LBP (Local Binary Patterns), calculées sur toute la pile
+        lbp = self._compute_lbp(resized)
+
+        # Combiner les features
+        return np.concatenate([np.stack(hists), lbp], axis=1)
+
+    def encoder_throughput(self):
+        """Débit moyen de l'encodeur en visages par seconde"""
+        seconds = self.encoder_stats["seconds"]
+        return self.encoder_stats["faces"] / seconds if seconds else 0.0
 
     def _compute_lbp(self, image):
-        """Calcule les Local Binary Patterns (alternative simple aux deep features)"""
-        h, w = image.shape
-        lbp = np.zeros((h-2, w-2), dtype=np.uint8)
-        
-        for i in range(1, h-1):
-            for j in range(1, w-1):
-                center = image[i, j]
-                code = 0
-                code |= (image[i-1, j-1] >= center) << 7
-                code |= (image[i-1, j] >= center) << 6
-                code |= (image[i-1, j+1] >= center) << 5
-                code |= (image[i, j+1] >= center) << 4
-                code |= (image[i+1, j+1] >= center) << 3
-                code |= (image[i+1, j] >= center) << 2
-                code |= (image[i+1, j-1] >= center) << 1
-                code |= (image[i, j-1] >= center) << 0
-                lbp[i-1, j-1] = code
-        
-        # Histogramme LBP
-        hist_lbp = cv2.calcHist([lbp], [0], None, [256], [0, 256]).flatten()
-        return hist_lbp / (hist_lbp.sum() + 1e-7)
+        """Calcule les Local Binary Patterns (alternative simple aux deep features)
 
-    def _compare_faces(self, known_encodings, face_encoding):
-        """Compare un visage avec les visages connus (alternative à face_recognition.face_distance)"""
-        if face_encoding is None or not known_encodings:
-            return []
-        
-        distances = []
-        for known_encoding in known_encodings:
-            # Distance euclidienne
-            distance = np.linalg.norm(known_encoding - face_encoding)
-            distances.append(distance)
-        
-        return np.array(distances)
+        Accepte une image (H, W) ou une pile de visages (N, H, W).
+        """
+        return lbp_histogram(image)
+
+    def detect_faces_in_frame(self, frame, return_all_faces=False, use_ann=None):
+        """Détection complète avec OpenCV (sans dlib)
 
-    def detect_faces_in_frame(self, frame, return_all_faces=False):
-        """Détection complète avec OpenCV (sans dlib)"""
+        use_ann=True interroge l'index approximatif au lieu d'un parcours
+        exact de la galerie (None = réglage de l'instance).
+        """
         if frame is None or frame.size == 0:
             return []
 
         try:
-            # Détection des visages avec Haar Cascade
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            faces = self.face_cascade.detectMultiScale(
-                gray,
-                scaleFactor=1.1,
-                minNeighbors=5,
-                minSize=(30, 30),
-                flags=cv2.CASCADE_SCALE_IMAGE
-            )
+            # Détection des visages avec le backend choisi (Haar par défaut)
+            faces = self._detect_boxes(frame)
             
             if len(faces) == 0:
                 return []
+
+            return self.recognize_faces(frame, faces, return_all_faces, use_ann)
+            
+        except Exception as e:
+            print(f"✗ Erreur détection : {e}")
+            return []
+
+    def recognize_faces(self, frame, boxes, return_all_faces=False, use_ann=None):
+        """Encode et identifie des visages déjà localisés (boîtes (x, y, w, h))
+
+        Avec return_all_faces=True, le résultat contient une entrée par boîte, dans l'ordre.
+        """
+        # Extraire les encodages de tous les visages en une seule passe réseau
+        face_images = []
+        for (x, y, w, h) in boxes:
+            face_image = frame[y:y+h, x:x+w]
             
-            results = []
+            # Convertir en RGB si nécessaire
+            if len(face_image.shape) == 2:
+                face_image = cv2.cvtColor(face_image, cv2.COLOR_GRAY2BGR)
             
-            for (x, y, w, h) in faces:
-                # Extraire la région du visage
-                face_image = frame[y:y+h, x:x+w]
-                
-                # Convertir en RGB si nécessaire
-                if len(face_image.shape) == 2:
-                    face_image = cv2.cvtColor(face_image, cv2.COLOR_GRAY2BGR)
-                
-                # Extraire l'encodage
-                encoding = self._extract_face_encoding(face_image)
-                
-                if encoding is None:
-                    if return_all_faces:
-                        results.append({
-                            "student": {"id": -1, "name": "Erreur encodage"},
-                            "location": (y, x+w, y+h, x),
-                            "confidence": 0
-                        })
-                    continue
-                
-                # Comparer avec les visages connus
-                if self.known_encodings:
-                    distances = self._compare_faces(self.known_encodings, encoding)
-                    best_idx = np.argmin(distances)
-                    dist = distances[best_idx]
-                    
-                    # Ajuster le seuil selon le type d'encodage
-                    threshold = self.tolerance if self.face_recognizer else 0.4
-                    
-                    if dist < threshold:
-                        student = self.known_students[best_idx]
-                        results.append({
-                            "student": student,
-                            "location": (y, x+w, y+h, x),
-                            "confidence": round(max(0, (1 - dist / threshold) * 100), 1)
-                        })
-                    elif return_all_faces:
-                        results.append({
-                            "student": {"id": -1, "name": f"Inconnu ({dist:.2f})"},
-                            "location": (y, x+w, y+h, x),
-                            "confidence": 0
-                        })
-                elif return_all_faces:
+            face_images.append(face_image)
+        encodings = self._extract_face_encodings(face_images)
+
+        return self._match_encodings(boxes, encodings, return_all_faces, use_ann)
+
+    def _track_and_recognize(self, tracker, frame):
+        """Détecte, associe aux pistes et n'encode que les pistes nouvelles ou à re-vérifier"""
+        try:
+            pending = tracker.update(frame, self._detect_boxes(frame))
+            if pending:
+                faces = self.recognize_faces(frame, [t.box for t in pending], return_all_faces=True)
+                tracker.assign(pending, faces)
+        except Exception as e:
+            print(f"✗ Erreur détection : {e}")
+        return tracker.faces()
+
+    def _detection_scale(self, frame_shape):
+        """Facteur de réduction de l'image de détection (1.0 = pleine résolution)
+
+        La largeur de travail borne le coût ; le plus petit visage recherché
+        doit rester au-dessus de la taille minimale du détecteur après réduction.
+        """
+        if self.detection_width is None and self.min_face_size is None:
+            return 1.0
+
+        width = frame_shape[1]
+        scale = min(1.0, self.detection_width / width) if self.detection_width else 0.0
+        if self.min_face_size:
+            detector_min = min(self.detector_backend.min_size)
+            scale = max(scale, detector_min / self.min_face_size)
+        return min(1.0, scale)
+
+    def _detect_boxes(self, frame):
+        """Détecte les visages (sur une image réduite si configuré), boîtes en pleine résolution"""
+        scale = self._detection_scale(frame.shape)
+        if scale >= 1.0:
+            return self.detector_backend.detect(frame)
+
+        small = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        min_size = None
+        if self.min_face_size:
+            min_side = max(min(self.detector_backend.min_size), int(self.min_face_size * scale))
+            min_size = (min_side, min_side)
+        boxes = self.detector_backend.detect(small, min_size=min_size)
+        if len(boxes) == 0:
+            return boxes
+
+        # Ramener les boîtes dans les coordonnées de l'image d'origine
+        h, w = frame.shape[:2]
+        boxes = np.round(boxes / scale).astype(np.int32)
+        boxes[:, 0] = np.clip(boxes[:, 0], 0, w - 1)
+        boxes[:, 1] = np.clip(boxes[:, 1], 0, h - 1)
+        boxes[:, 2] = np.minimum(boxes[:, 2], w - boxes[:, 0])
+        boxes[:, 3] = np.minimum(boxes[:, 3], h - boxes[:, 1])
+        return boxes
+
+    def _nearest_students(self, queries, use_ann=None):
+        """Retourne (étudiants, distances) du plus proche voisin de chaque requête"""
+        if use_ann is None:
+            use_ann = self.use_ann
+
+        gallery = self.gallery  # instantané : la galerie peut être remplacée pendant l'appel
+        if use_ann:
+            ids, dists = self._ensure_ann_index().search(queries, k=1)
+            return [gallery.student_by_id(sid) for sid in ids[:, 0]], dists[:, 0]
+
+        indices, dists = gallery.match(queries, k=1)
+        return [gallery.students[i] for i in indices[:, 0]], dists[:, 0]
+
+    def _match_encodings(self, boxes, encodings, return_all_faces=False, use_ann=None):
+        """Compare tous les visages d'une image à la galerie en un seul appel"""
+        valid = [i for i, enc in enumerate(encodings) if enc is not None]
+        best_student = best_dist = None
+        if valid and len(self.gallery):
+            students, dists = self._nearest_students(np.stack([encodings[i] for i in valid]), use_ann)
+            best_student = dict(zip(valid, students))
+            best_dist = dict(zip(valid, dists))
+
+        # Ajuster le seuil selon le type d'encodage
+        threshold = self.tolerance if self.face_recognizer else 0.4
+
+        results = []
+        for i, (x, y, w, h) in enumerate(boxes):
+            location = (int(y), int(x+w), int(y+h), int(x))
+
+            if encodings[i] is None:
+                if return_all_faces:
+                    results.append({
+                        "student": {"id": -1, "name": "Erreur encodage"},
+                        "location": location,
+                        "confidence": 0
+                    })
+                continue
+
+            if best_student is None or best_student[i] is None:
+                if return_all_faces:
                     results.append({
                         "student": {"id": -1, "name": "Inconnu"},
-                        "location": (y, x+w, y+h, x),
+                        "location": location,
                         "confidence": 0
                     })
-            
-            return results
-            
-        except Exception as e:
-            print(f"✗ Erreur détection : {e}")
-            return []
+                continue
+
+            dist = float(best_dist[i])
+            if dist < threshold:
+                results.append({
+                    "student": best_student[i],
+                    "location": location,
+                    "confidence": round(max(0, (1 - dist / threshold) * 100), 1)
+                })
+            elif return_all_faces:
+                results.append({
+                    "student": {"id": -1, "name": f"Inconnu ({dist:.2f})"},
+                    "location": location,
+                    "confidence": 0
+                })
+
+        return results
 
     def draw_faces_on_frame(self, frame, faces):
         """Dessine les rectangles et labels sur les visages détectés"""
@@ -223,75 +461,87 @@ class FaceDetector:
         
         return frame
 
-    def _attendance_loop(self, database, session_id):
-        """Boucle principale de détection de présence"""
+    def _attendance_loop(self, database, session_id, event_bus=None, source=0, display=True):
+        """Boucle principale de détection de présence (sans aucun appel GUI si display=False)"""
         self.running = True
         self.marked_students.clear()
         
-        if not self.known_encodings:
+        if len(self.gallery) == 0:
             self.load_encodings_from_database(database)
 
-        cap = cv2.VideoCapture(0)
-        if not cap.isOpened():
-            print("✗ Webcam inaccessible")
-            self.running = False
-            return
-
-        print(f"✓ Session démarrée - {len(self.known_encodings)} étudiants | Appuyez sur Q pour quitter")
+        if display:
+            print(f"✓ Session démarrée - {len(self.gallery)} étudiants | Appuyez sur Q pour quitter")
+        else:
+            print(f"✓ Session démarrée sans affichage - {len(self.gallery)} étudiants | Source : {source}")
         print("ℹ️ Utilisation d'OpenCV pur (sans dlib)")
 
-        frame_count = 0
-        while self.running:
-            ret, frame = cap.read()
-            if not ret:
-                print("✗ Erreur lecture webcam")
-                break
-
-            display = frame.copy()
-            frame_count += 1
-
-            # Détection tous les 5 frames
-            if frame_count % 5 == 0:
-                faces = self.detect_faces_in_frame(frame, return_all_faces=True)
-                display = self.draw_faces_on_frame(display, faces)
-
-                # Marquer la présence
-                for face in faces:
-                    sid = face["student"].get("id", -1)
-                    if sid != -1 and sid not in self.marked_students:
-                        if database.mark_attendance(session_id, sid):
-                            self.marked_students.add(sid)
-                            print(f"✓ {face['student']['name']} marqué présent ({face['confidence']}%)")
-
-            # Affichage des informations
-            cv2.putText(display, f"Session: {session_id}", (10, 30), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
-            cv2.putText(display, f"Presents: {len(self.marked_students)}", (10, 70), 
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 2)
-            
-            cv2.imshow("Presence Faciale", display)
-
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                print("✓ Arrêt demandé par l'utilisateur")
-                break
+        # Capture, reconnaissance, persistance et affichage dans des étapes séparées
+        pipeline = AttendancePipeline(self, database, session_id, source=source, display=display,
+                                      recorder_options={"event_bus": event_bus})
+        self.pipeline = pipeline
+        self.tracker = tracker = pipeline.tracker
+        if not pipeline.run():
+            self.session_error = f"Source vidéo inaccessible : {source}"
+            self.running = False
+            database.end_session(session_id)  # séance jamais démarrée : ne pas la laisser ouverte
+            return
+        if pipeline.capture is not None and getattr(pipeline.capture, "failed", False):
+            self.session_error = f"Lecture interrompue : {source}"
 
-        cap.release()
-        cv2.destroyAllWindows()
         self.running = False
         print(f"✓ Session terminée - {len(self.marked_students)} présents")
+        if tracker is not None:
+            print(f"ℹ️ Suivi : {tracker.encoded_faces} visage(s) encodé(s), {tracker.encoder_rate():.1f}/s")
+        print(f"ℹ️ Encodeur : {self.encoder_throughput():.0f} visages/s | "
+              f"Détecteur {self.detector_backend.name} : {self.detector_backend.latency_stats()['avg_ms']} ms/image")
+
+    def start_attendance_session(self, database, session_id, event_bus=None, source=0, headless=False):
+        """Démarre la session de prise de présence en arrière-plan (présences publiées sur event_bus).
 
-    def start_attendance_session(self, database, session_id):
-        """Démarre la session de prise de présence en arrière-plan"""
-        Thread(target=self._attendance_loop, args=(database, session_id), daemon=True).start()
+        source : index de périphérique, chemin de fichier vidéo ou URL HTTP/RTSP.
+        headless : aucune fenêtre OpenCV (serveurs sans affichage), arrêt par stop_attendance_session.
+        """
+        self.running = True
+        self.session_id = session_id
+        self.session_source = source
+        self.session_headless = headless
+        self.session_error = None
+        self.pipeline = None
+        self._session_thread = Thread(target=self._attendance_loop,
+                                      args=(database, session_id, event_bus, source, not headless), daemon=True)
+        self._session_thread.start()
         return {"status": "started", "session_id": session_id}
 
+    def live_status(self):
+        """État de la session locale : source, FPS de capture et de reconnaissance, présents"""
+        stages = self.pipeline.stats() if self.pipeline else {}
+        return {
+            "session_id": self.session_id,
+            "running": self.running,
+            "source": self.session_source,
+            "headless": self.session_headless,
+            "error": self.session_error,
+            "capture_fps": stages.get("capture", {}).get("fps", 0.0),
+            "recognition_fps": stages.get("recognition", {}).get("fps", 0.0),
+            "marked_count": len(self.marked_students),
+            "pipeline": stages or None,
+        }
+
     def stop_attendance_session(self):
-        """Arrête la session en cours"""
+        """Arrête la session en cours (attend le dernier enregistrement des présences)"""
         self.running = False
-        time.sleep(1)
+        if self._session_thread is not None:
+            self._session_thread.join(timeout=10)
+        else:
+            time.sleep(1)
         stats = {
             "marked_count": len(self.marked_students),
-            "marked_ids": list(self.marked_students)
+            "marked_ids": list(self.marked_students),
+            "encoder_faces_per_sec": round(self.encoder_throughput(), 1),
+            "encoded_faces": self.tracker.encoded_faces if self.tracker else None,
+            "encoded_faces_per_sec": round(self.tracker.encoder_rate(), 2) if self.tracker else None,
+            "detector": self.detector_backend.latency_stats(),
+            "pipeline": self.pipeline.stats() if self.pipeline else None
         }
         return stats
 
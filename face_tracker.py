@@ -0,0 +1,161 @@
+"""
+Suivi multi-visages entre deux détections
+
+Associe les boîtes détectées aux pistes existantes par IoU (glouton) afin
+de conserver l'identité d'un visage d'une détection à l'autre. Seules les
+nouvelles pistes, les pistes non identifiées et celles à re-vérifier
+périodiquement repassent par l'encodeur.
+
+Optionnellement, un tracker OpenCV (KCF / MIL) met à jour la position des
+visages entre deux détections.
+"""
+
+import time
+
+import cv2
+
+
+def box_iou(a, b):
+    """IoU entre deux boîtes (x, y, w, h)"""
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = ix * iy
+    union = aw * ah + bw * bh - inter
+    return inter / union if union > 0 else 0.0
+
+
+def _create_cv_tracker():
+    """Crée le tracker OpenCV disponible le plus léger, ou None"""
+    for factory in ("TrackerKCF_create", "legacy.TrackerKCF_create", "TrackerMIL_create"):
+        module = cv2
+        for part in factory.split("."):
+            module = getattr(module, part, None)
+            if module is None:
+                break
+        if module is not None:
+            return module()
+    return None
+
+
+class Track:
+    def __init__(self, track_id, box, tick):
+        self.id = track_id
+        self.box = tuple(int(v) for v in box)
+        self.face = None              # dernier résultat de reconnaissance
+        self.last_verified = None     # tick de la dernière reconnaissance
+        self.created = tick
+        self.misses = 0
+        self.cv_tracker = None
+
+    @property
+    def student_id(self):
+        return self.face["student"].get("id", -1) if self.face else -1
+
+    def as_face(self):
+        """Résultat au format detect_faces_in_frame, à la position courante"""
+        x, y, w, h = self.box
+        face = dict(self.face) if self.face else {"student": {"id": -1, "name": "..."}, "confidence": 0}
+        face["location"] = (y, x + w, y + h, x)
+        face["track_id"] = self.id
+        return face
+
+
+class FaceTracker:
+    def __init__(self, iou_threshold=0.3, max_misses=2, reverify_every=10, use_cv_trackers=False):
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.reverify_every = reverify_every
+        self.use_cv_trackers = use_cv_trackers
+        self.tracks = []
+        self.tick = 0
+        self._next_id = 1
+        self.encoded_faces = 0
+        self.started_at = time.perf_counter()
+
+    def update(self, frame, boxes):
+        """Associe les boîtes détectées aux pistes.
+
+        Retourne les pistes à (ré)encoder : nouvelles, non identifiées ou
+        dont la dernière vérification date de plus de reverify_every ticks.
+        """
+        self.tick += 1
+        boxes = [tuple(int(v) for v in b) for b in boxes]
+
+        # Association gloutonne par IoU décroissante
+        pairs = sorted(
+            ((box_iou(t.box, b), ti, bi) for ti, t in enumerate(self.tracks) for bi, b in enumerate(boxes)),
+            reverse=True,
+        )
+        matched_tracks, matched_boxes = set(), set()
+        for iou, ti, bi in pairs:
+            if iou < self.iou_threshold:
+                break
+            if ti in matched_tracks or bi in matched_boxes:
+                continue
+            matched_tracks.add(ti)
+            matched_boxes.add(bi)
+            track = self.tracks[ti]
+            track.box = boxes[bi]
+            track.misses = 0
+            self._reset_cv_tracker(track, frame)
+
+        # Pistes perdues
+        for ti, track in enumerate(self.tracks):
+            if ti not in matched_tracks:
+                track.misses += 1
+        self.tracks = [t for t in self.tracks if t.misses <= self.max_misses]
+
+        # Nouvelles pistes
+        for bi, box in enumerate(boxes):
+            if bi not in matched_boxes:
+                track = Track(self._next_id, box, self.tick)
+                self._next_id += 1
+                self._reset_cv_tracker(track, frame)
+                self.tracks.append(track)
+
+        return [
+            t for t in self.tracks
+            if t.misses == 0 and (
+                t.last_verified is None
+                or t.student_id == -1
+                or self.tick - t.last_verified >= self.reverify_every
+            )
+        ]
+
+    def assign(self, tracks, faces):
+        """Enregistre les résultats de reconnaissance (alignés sur tracks)"""
+        for track, face in zip(tracks, faces):
+            self.encoded_faces += 1
+            track.last_verified = self.tick
+            # Un échec ponctuel ne fait pas perdre une identité déjà confirmée
+            if face["student"].get("id", -1) != -1 or track.student_id == -1:
+                track.face = face
+
+    def predict(self, frame):
+        """Met à jour les positions entre deux détections (trackers OpenCV)"""
+        if not self.use_cv_trackers:
+            return
+        for track in self.tracks:
+            if track.cv_tracker is None:
+                continue
+            ok, box = track.cv_tracker.update(frame)
+            if ok:
+                track.box = tuple(int(v) for v in box)
+
+    def _reset_cv_tracker(self, track, frame):
+        if not self.use_cv_trackers:
+            return
+        track.cv_tracker = _create_cv_tracker()
+        if track.cv_tracker is not None:
+            track.cv_tracker.init(frame, track.box)
+
+    def faces(self):
+        """Visages suivis (pistes actives) pour l'affichage"""
+        return [t.as_face() for t in self.tracks if t.misses == 0 or self.use_cv_trackers]
+
+    def encoder_rate(self):
+        """Visages encodés par seconde depuis le début du suivi"""
+        elapsed = time.perf_counter() - self.started_at
+        return self.encoded_faces / elapsed if elapsed > 0 else 0.0
@@ -0,0 +1,162 @@
+"""
+Bus d'images sans copie entre processus (multiprocessing.shared_memory)
+
+Un anneau de `slots` emplacements de taille fixe : le processus de capture
+écrit chaque image dans l'emplacement suivant avec un numéro de séquence,
+les processus de reconnaissance lisent des vues NumPy directement dans la
+mémoire partagée (aucune sérialisation, aucune copie).
+
+Une vue reste valable tant que l'écrivain n'a pas fait le tour de
+l'anneau ; `is_current(seq)` permet de vérifier après traitement qu'elle
+n'a pas été écrasée.
+"""
+
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from attendance_pipeline import StageStats
+
+# En-tête global : [séquence écrite, nombre d'emplacements, octets par emplacement, fermé]
+_HEADER_FIELDS = 4
+# En-tête par emplacement : [séquence, hauteur, largeur, canaux]
+_SLOT_FIELDS = 4
+
+
+class SharedFrameRing:
+    def __init__(self, name=None, slots=4, max_shape=(1080, 1920, 3)):
+        """Crée un anneau (name=None) ou s'attache à un anneau existant"""
+        if name is None:
+            slot_bytes = int(np.prod(max_shape))
+            size = (_HEADER_FIELDS + _SLOT_FIELDS * slots) * 8 + slots * slot_bytes
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+            self.owner = True
+            header = np.ndarray((_HEADER_FIELDS,), dtype=np.int64, buffer=self.shm.buf)
+            header[:] = (0, slots, slot_bytes, 0)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.owner = False
+
+        self._header = np.ndarray((_HEADER_FIELDS,), dtype=np.int64, buffer=self.shm.buf)
+        self.slots = int(self._header[1])
+        self.slot_bytes = int(self._header[2])
+        self._slot_meta = np.ndarray((self.slots, _SLOT_FIELDS), dtype=np.int64, buffer=self.shm.buf,
+                                     offset=_HEADER_FIELDS * 8)
+        self._data = np.ndarray((self.slots, self.slot_bytes), dtype=np.uint8, buffer=self.shm.buf,
+                                offset=(_HEADER_FIELDS + _SLOT_FIELDS * self.slots) * 8)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def write_seq(self):
+        return int(self._header[0])
+
+    @property
+    def closed(self):
+        return bool(self._header[3])
+
+    # === ÉCRITURE ===
+    def write(self, frame):
+        """Copie une image dans l'emplacement suivant, retourne son numéro de séquence"""
+        frame = np.ascontiguousarray(frame, dtype=np.uint8)
+        if frame.nbytes > self.slot_bytes:
+            raise ValueError(f"Image {frame.shape} trop grande pour l'anneau ({self.slot_bytes} octets)")
+
+        seq = self.write_seq + 1
+        idx = seq % self.slots
+        shape = frame.shape + (1,) * (3 - frame.ndim)
+
+        self._slot_meta[idx, 0] = -1  # emplacement en cours d'écriture
+        self._data[idx, :frame.nbytes] = frame.reshape(-1)
+        self._slot_meta[idx, 1:] = shape
+        self._slot_meta[idx, 0] = seq
+        self._header[0] = seq
+        return seq
+
+    def close(self):
+        """Signale aux lecteurs que plus aucune image ne sera écrite"""
+        self._header[3] = 1
+
+    # === LECTURE ===
+    def view(self, seq):
+        """Vue NumPy (sans copie) de l'image `seq`, ou None si elle a été écrasée"""
+        idx = seq % self.slots
+        if self._slot_meta[idx, 0] != seq:
+            return None
+        h, w, c = (int(v) for v in self._slot_meta[idx, 1:])
+        frame = self._data[idx, :h * w * c].reshape(h, w, c)
+        return frame if c > 1 else frame[:, :, 0]
+
+    def is_current(self, seq):
+        """Vrai si l'image `seq` n'a pas encore été écrasée par l'écrivain"""
+        return self._slot_meta[seq % self.slots, 0] == seq
+
+    def latest(self, after_seq=0, partition=None):
+        """Dernière image plus récente que after_seq : (seq, vue) ou (after_seq, None).
+
+        partition=(k, n) ne retient que les séquences seq % n == k, pour
+        répartir les images entre n lecteurs.
+        """
+        seq = self.write_seq
+        if partition is not None:
+            k, n = partition
+            seq -= (seq - k) % n
+        if seq <= after_seq or seq <= 0:
+            return after_seq, None
+        frame = self.view(seq)
+        return (seq, frame) if frame is not None else (after_seq, None)
+
+    def release(self):
+        """Détache la mémoire partagée (et la supprime si on en est le créateur)"""
+        self._header = self._slot_meta = self._data = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class RingFrameSource:
+    """Source d'images pour AttendancePipeline lue depuis un SharedFrameRing
+
+    Les images retournées sont des vues dans l'anneau (zero_copy) : le
+    lecteur les copie et vérifie is_current() avant de les traiter.
+    """
+    zero_copy = True
+
+    def __init__(self, ring, partition=None, poll_interval=0.002):
+        self.ring = ring
+        self.partition = partition
+        self.poll_interval = poll_interval
+        self.stop_event = None  # fourni par le pipeline
+        self.stats = StageStats("capture")
+        self.dropped = 0
+        self._last_seq = 0
+
+    def read(self, after_seq=0, timeout=0.5):
+        """Même contrat que LatestFrameCapture.read"""
+        deadline = time.monotonic() + timeout
+        while True:
+            seq, frame = self.ring.latest(after_seq, self.partition)
+            if frame is not None:
+                step = self.partition[1] if self.partition else 1
+                self.dropped += max(0, (seq - max(self._last_seq, after_seq)) // step - 1)
+                self._last_seq = seq
+                self.stats.tick()
+                return seq, frame
+            if self.ring.closed:
+                if self.stop_event is not None:
+                    self.stop_event.set()
+                return after_seq, None
+            if time.monotonic() >= deadline or (self.stop_event is not None and self.stop_event.is_set()):
+                return after_seq, None
+            time.sleep(self.poll_interval)
+
+    def is_current(self, seq):
+        """Vrai si la vue retournée pour `seq` n'a pas été écrasée depuis"""
+        return self.ring.is_current(seq)
+
+    @property
+    def queue_depth(self):
+        return max(0, self.ring.write_seq - self._last_seq)
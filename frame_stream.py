@@ -0,0 +1,83 @@
+"""
+État d'un flux d'images WebSocket (/sessions/{id}/stream)
+
+La réception et la reconnaissance tournent en parallèle : chaque image
+reçue remplace la précédente si celle-ci n'a pas encore été prise en
+charge (latest-frame-wins). Un client plus rapide que la reconnaissance
+voit donc des images sautées, jamais une file qui grossit.
+"""
+
+import asyncio
+import itertools
+import time
+from collections import deque
+
+import numpy as np
+
+_stream_ids = itertools.count(1)
+
+
+class FrameStream:
+    def __init__(self, session_id):
+        self.id = next(_stream_ids)
+        self.session_id = session_id
+        self.started_at = time.perf_counter()
+        self.closed = False
+
+        self.received = 0
+        self.processed = 0
+        self.dropped = 0
+        self._latency_ms = deque(maxlen=500)
+
+        self._frame = None  # (numéro, octets, heure de réception)
+        self._ready = asyncio.Event()
+
+    # === CÔTÉ RÉCEPTION ===
+    def push(self, data):
+        """Dépose une image reçue, en écrasant celle qui attend encore"""
+        self.received += 1
+        if self._frame is not None:
+            self.dropped += 1
+        self._frame = (self.received, data, time.perf_counter())
+        self._ready.set()
+
+    def close(self):
+        self.closed = True
+        self._ready.set()
+
+    # === CÔTÉ RECONNAISSANCE ===
+    async def next_frame(self):
+        """Attend la prochaine image (la plus récente), None quand le flux est fermé"""
+        while self._frame is None:
+            if self.closed:
+                return None
+            self._ready.clear()
+            await self._ready.wait()
+        frame, self._frame = self._frame, None
+        return frame
+
+    def drop(self):
+        """Image abandonnée après sa prise en charge (reconnaissance saturée)"""
+        self.dropped += 1
+
+    def done(self, received_at):
+        """Image traitée ; retourne la latence réception → résultat (ms)"""
+        latency_ms = (time.perf_counter() - received_at) * 1000
+        self.processed += 1
+        self._latency_ms.append(latency_ms)
+        return latency_ms
+
+    # === STATISTIQUES ===
+    def stats(self):
+        elapsed = time.perf_counter() - self.started_at
+        latencies = list(self._latency_ms)
+        p50, p99 = np.percentile(latencies, [50, 99]) if latencies else (0.0, 0.0)
+        return {
+            "stream_id": self.id,
+            "session_id": self.session_id,
+            "received": self.received,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "fps": round(self.processed / elapsed, 1) if elapsed > 0 else 0.0,
+            "latency_ms": {"p50": round(float(p50), 2), "p99": round(float(p99), 2)},
+        }
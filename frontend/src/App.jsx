@@ -50,6 +50,19 @@ function AttendanceList({ sessionId, students, onClose }) {
       }
     }
     fetchAttendance()
+
+    // Présences poussées par le serveur (SSE) ; `reset` = événements perdus, tout relire
+    const events = new EventSource(`${API_URL}/sessions/${sessionId}/events`)
+    events.addEventListener('checkin', (event) => {
+      const checkin = JSON.parse(event.data)
+      setAttendanceData((prev) =>
+        prev.some((a) => a.student_id === checkin.student_id)
+          ? prev
+          : [...prev, { student_id: checkin.student_id, check_in_time: checkin.check_in_time, status: 'present' }],
+      )
+    })
+    events.addEventListener('reset', fetchAttendance)
+    return () => events.close()
   }, [sessionId])
 
   // Créer un Set des IDs présents
@@ -166,6 +179,23 @@ function App() {
     refreshData()
   }, [])
 
+  // Compteurs de la séance en cours poussés par le serveur (SSE) au lieu d'être rafraîchis à la main
+  const liveSessionId = sessionResult?.session_id
+  useEffect(() => {
+    if (!liveSessionId) return undefined
+    const events = new EventSource(`${API_URL}/sessions/${liveSessionId}/events`)
+    events.addEventListener('stats', (event) => {
+      const stats = JSON.parse(event.data)
+      setSessionResult((prev) => (prev && prev.session_id === liveSessionId ? { ...prev, stats } : prev))
+    })
+    events.addEventListener('checkin', (event) => {
+      const checkin = JSON.parse(event.data)
+      notify('success', `✓ ${checkin.student_name || `Étudiant ${checkin.student_id}`} présent(e)`)
+    })
+    events.addEventListener('reset', () => refreshSessionStats(liveSessionId))
+    return () => events.close()
+  }, [liveSessionId])
+
   useEffect(() => {
     return () => {
       if (captureStream) {
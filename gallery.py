@@ -0,0 +1,205 @@
+"""
+Galerie de visages connus stockée dans une matrice float32 contiguë
+
+Les distances entre tous les visages d'une image et tous les étudiants
+sont calculées en un seul produit matriciel (BLAS) :
+    ||q - g||² = ||q||² + ||g||² - 2 q·g
+
+Un instantané (save_snapshot / load_snapshot) permet de rouvrir la
+galerie sans relire la base : la matrice est projetée en mémoire (mmap)
+et ses pages sont partagées entre processus.
+"""
+
+import json
+import os
+from collections import Counter
+
+import numpy as np
+
+
+class FaceGallery:
+    def __init__(self):
+        self.matrix = np.empty((0, 0), dtype=np.float32)
+        self.sq_norms = np.empty(0, dtype=np.float32)
+        self.students = []
+        self.ids = np.empty(0, dtype=np.int64)
+        self._row_of = {}
+
+    def __len__(self):
+        return len(self.students)
+
+    @property
+    def dim(self):
+        return self.matrix.shape[1] if len(self.students) else 0
+
+    def load(self, encodings, students):
+        """Construit la matrice à partir d'une liste d'encodages.
+
+        Les encodages dont la dimension diffère de la dimension majoritaire
+        (ex: anciens encodages dlib 128D) sont ignorés. Une matrice (N, D)
+        déjà construite (AttendanceDatabase.get_student_encodings) est
+        utilisée telle quelle.
+        """
+        if isinstance(encodings, np.ndarray) and encodings.ndim == 2:
+            if len(encodings) == 0:
+                self.__init__()
+            else:
+                self.set_matrix(encodings, students)
+            return
+
+        encodings = [np.asarray(enc, dtype=np.float32).ravel() for enc in encodings]
+        if not encodings:
+            self.__init__()
+            return
+
+        dim = Counter(len(enc) for enc in encodings).most_common(1)[0][0]
+        keep = [i for i, enc in enumerate(encodings) if len(enc) == dim]
+        skipped = len(encodings) - len(keep)
+        if skipped:
+            print(f"⚠️ {skipped} encodage(s) ignoré(s) (dimension différente de {dim})")
+
+        matrix = np.empty((len(keep), dim), dtype=np.float32)
+        for row, i in enumerate(keep):
+            matrix[row] = encodings[i]
+        self.set_matrix(matrix, [students[i] for i in keep])
+
+    def set_matrix(self, matrix, students):
+        """Remplace la galerie par une matrice (N, D) déjà construite"""
+        matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        if matrix.ndim != 2 or matrix.shape[0] != len(students):
+            raise ValueError(f"Matrice {matrix.shape} incompatible avec {len(students)} étudiant(s)")
+        self.matrix = matrix
+        self.sq_norms = np.einsum("ij,ij->i", matrix, matrix)
+        self.students = list(students)
+        self.ids = np.array([s.get("id", -1) for s in self.students], dtype=np.int64)
+        self._row_of = dict(zip(self.ids.tolist(), range(len(self.ids))))
+
+    # === MISES À JOUR (copie, la galerie courante reste intacte) ===
+    def with_faces(self, students, encodings):
+        """Nouvelle galerie avec ces visages ajoutés, ou remplacés si l'id existe déjà"""
+        encodings = np.atleast_2d(np.asarray(encodings, dtype=np.float32))
+        if len(students) != len(encodings):
+            raise ValueError(f"{len(encodings)} encodage(s) pour {len(students)} étudiant(s)")
+        if len(self) and encodings.shape[1] != self.dim:
+            raise ValueError(f"Dimension {encodings.shape[1]} incompatible avec la galerie ({self.dim})")
+
+        new_students = list(self.students)
+        rows = []
+        row_of = dict(self._row_of)
+        for student, encoding in zip(students, encodings):
+            sid = int(student["id"])
+            if sid not in row_of:
+                row_of[sid] = len(new_students)
+                new_students.append(student)
+            else:
+                new_students[row_of[sid]] = student
+            rows.append(row_of[sid])
+
+        base = self.matrix if len(self) else np.empty((0, encodings.shape[1]), dtype=np.float32)
+        matrix = np.empty((len(new_students), encodings.shape[1]), dtype=np.float32)
+        matrix[:len(base)] = base
+        matrix[rows] = encodings
+
+        gallery = FaceGallery()
+        gallery.set_matrix(matrix, new_students)
+        return gallery
+
+    def without(self, student_ids):
+        """Nouvelle galerie sans ces étudiants (les ids absents sont ignorés)"""
+        keep = ~np.isin(self.ids, np.asarray(list(student_ids), dtype=np.int64))
+        gallery = FaceGallery()
+        if keep.any():
+            gallery.set_matrix(self.matrix[keep], [s for s, k in zip(self.students, keep) if k])
+        return gallery
+
+    def student_by_id(self, student_id):
+        """Retourne le dictionnaire étudiant correspondant à un id, ou None"""
+        row = self._row_of.get(int(student_id))
+        return None if row is None else self.students[row]
+
+    def distances(self, queries):
+        """Distances euclidiennes (Q, N) entre les requêtes et toute la galerie"""
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        if not len(self.students) or queries.shape[0] == 0:
+            return np.empty((queries.shape[0], len(self.students)), dtype=np.float32)
+        if queries.shape[1] != self.dim:
+            raise ValueError(f"Dimension {queries.shape[1]} incompatible avec la galerie ({self.dim})")
+
+        q_norms = np.einsum("ij,ij->i", queries, queries)
+        sq = q_norms[:, np.newaxis] + self.sq_norms[np.newaxis, :] - 2.0 * (queries @ self.matrix.T)
+        np.maximum(sq, 0, out=sq)
+        return np.sqrt(sq)
+
+    def match(self, queries, k=1):
+        """Retourne (indices, distances) des k plus proches voisins, triés, shape (Q, k)"""
+        dist = self.distances(queries)
+        n = dist.shape[1]
+        k = min(k, n)
+        if k == 0:
+            empty = np.empty((dist.shape[0], 0))
+            return empty.astype(np.int64), empty.astype(np.float32)
+
+        if k < n:
+            idx = np.argpartition(dist, k - 1, axis=1)[:, :k]
+        else:
+            idx = np.broadcast_to(np.arange(n), dist.shape).copy()
+        part = np.take_along_axis(dist, idx, axis=1)
+        order = np.argsort(part, axis=1)
+        return np.take_along_axis(idx, order, axis=1), np.take_along_axis(part, order, axis=1)
+
+
+# === INSTANTANÉ SUR DISQUE ===
+# <préfixe>.json : métadonnées (format, modèle, empreinte de la base, étudiants, fichier matrice)
+# <préfixe>-v<version>.npy : matrice (N, D) float32, ouverte en mémoire partagée (mmap)
+SNAPSHOT_FORMAT = 1
+
+
+def save_snapshot(gallery, prefix, fingerprint, model):
+    """Écrit l'instantané de la galerie (remplacement atomique des fichiers)"""
+    directory = os.path.dirname(os.path.abspath(prefix))
+    os.makedirs(directory, exist_ok=True)
+    matrix_name = f"{os.path.basename(prefix)}-v{fingerprint[1]}.npy"
+    matrix_path = os.path.join(directory, matrix_name)
+
+    tmp_suffix = f".tmp{os.getpid()}"
+    with open(matrix_path + tmp_suffix, "wb") as f:
+        np.save(f, np.ascontiguousarray(gallery.matrix, dtype=np.float32))
+    os.replace(matrix_path + tmp_suffix, matrix_path)
+
+    meta = {
+        "format": SNAPSHOT_FORMAT,
+        "model": model,
+        "fingerprint": list(fingerprint),
+        "matrix": matrix_name,
+        "ids": [int(s["id"]) for s in gallery.students],
+        "names": [s.get("name") for s in gallery.students],
+    }
+    with open(prefix + ".json" + tmp_suffix, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(prefix + ".json" + tmp_suffix, prefix + ".json")
+
+    # Anciennes matrices : les processus qui les ont ouvertes gardent leur mapping
+    for name in os.listdir(directory):
+        if name.startswith(f"{os.path.basename(prefix)}-v") and name.endswith(".npy") and name != matrix_name:
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass  # encore ouverte (Windows)
+
+
+def load_snapshot(prefix, fingerprint, model):
+    """Ouvre l'instantané en mmap s'il correspond à l'empreinte de la base, sinon None"""
+    try:
+        with open(prefix + ".json", encoding="utf-8") as f:
+            meta = json.load(f)
+        if (meta.get("format") != SNAPSHOT_FORMAT or meta.get("model") != model
+                or meta.get("fingerprint") != list(fingerprint)):
+            return None
+        students = [{"id": sid, "name": name} for sid, name in zip(meta["ids"], meta["names"])]
+        gallery = FaceGallery()
+        if students:
+            matrix_path = os.path.join(os.path.dirname(os.path.abspath(prefix)), meta["matrix"])
+            gallery.set_matrix(np.load(matrix_path, mmap_mode="r"), students)
+        return gallery
+    except (OSError, ValueError, KeyError):
+        return None
@@ -69,7 +69,7 @@ class AttendanceSystem:
             print("✗ Échec de la capture de la photo. Inscription annulée.")
             return
         
-        student_id = self.db.add_student(first_name, last_name, photo_path, encoding)
+        student_id = self.db.add_student(first_name, last_name, photo_path, encoding, model=self.detector.encoding_model)
         
         if student_id:
             print(f"\n✓ Étudiant {first_name} {last_name} inscrit avec succès!")
@@ -1,29 +1,106 @@
 """
 Script de migration : Ré-encode tous les étudiants avec le nouveau système OpenCV
 À exécuter UNE SEULE FOIS après le changement de système
+
+La migration parallèle (menu 4) répartit les étudiants sur un pool de
+processus, écrit les encodages par transactions groupées et enregistre
+un point de reprise (<base>.migration.json) : une migration interrompue
+repart du dernier lot écrit. Le menu 5 estime la durée sans rien écrire.
 """
 
 import cv2
+import json
+import multiprocessing as mp
 import numpy as np
 import os
 import sys
-import pickle
-import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from database import AttendanceDatabase, blob_to_encoding
 from face_detector import FaceDetector
 
+
+def find_student_photo(photo_path):
+    """Cherche la photo parmi les chemins possibles (relatifs et absolus), retourne (image, chemin)"""
+    possible_paths = [
+        photo_path,
+        os.path.join('static', photo_path) if not photo_path.startswith('static') else photo_path,
+        os.path.join('uploads', photo_path),
+        photo_path.replace('\\', '/'),
+    ]
+    for path in possible_paths:
+        if os.path.exists(path):
+            image = cv2.imread(path)
+            if image is not None:
+                return image, path
+    return None, None
+
+
+def _format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m{seconds:02d}s" if hours else f"{minutes}m{seconds:02d}s"
+
+
+# === CÔTÉ PROCESSUS DU POOL (migration parallèle) ===
+_worker_detector = None
+
+
+def _init_worker():
+    global _worker_detector
+    cv2.setNumThreads(1)  # un processus par cœur : pas de threads OpenCV en plus
+    _worker_detector = FaceDetector()
+
+
+def _worker_ready():
+    return True
+
+
+def _encode_students(students):
+    """Traite un lot d'étudiants → [(id, encodage ou None, erreur ou None)]"""
+    detector = _worker_detector
+    results = []
+    crops, owners = [], []
+    for student in students:
+        image, _ = find_student_photo(student['photo_path'])
+        if image is None:
+            results.append((student['id'], None, f"Image introuvable: {student['photo_path']}"))
+            continue
+
+        boxes = detector._detect_boxes(image)
+        if len(boxes) == 0:
+            # Paramètres moins stricts, comme en migration série
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            boxes = detector.face_cascade.detectMultiScale(gray, scaleFactor=1.05, minNeighbors=3, minSize=(20, 20))
+        if len(boxes) == 0:
+            results.append((student['id'], None, "Aucun visage détecté"))
+            continue
+
+        x, y, w, h = (int(v) for v in boxes[0])
+        crops.append(image[y:y + h, x:x + w])
+        owners.append(student['id'])
+
+    # Un seul appel à l'encodeur pour tous les visages du lot
+    encodings = detector._extract_face_encodings(crops) if crops else []
+    for student_id, encoding in zip(owners, encodings):
+        if encoding is None:
+            results.append((student_id, None, "Erreur extraction encodage"))
+        else:
+            results.append((student_id, np.asarray(encoding, dtype=np.float32), None))
+    return results
+
+
 class EncodingMigrator:
     def __init__(self, db_name='attendance_system.db'):
         self.db_name = db_name
+        self.database = AttendanceDatabase(db_name)  # met le schéma à jour (colonnes dim/model, encodages pickle)
         self.detector = FaceDetector()
-    
+        self.checkpoint_path = os.path.splitext(db_name)[0] + '.migration.json'
+
     def get_all_students(self):
         """Récupère tous les étudiants de la base"""
-        conn = sqlite3.connect(self.db_name)
-        c = conn.cursor()
-        c.execute('SELECT id, first_name, last_name, photo_path FROM students')
-        students = c.fetchall()
-        conn.close()
-        
+        students = self.database.get_all_students()
+
         return [
             {
                 'id': row[0],
@@ -36,36 +113,20 @@ class EncodingMigrator:
         ]
     
     def update_student_encoding(self, student_id, encoding):
-        """Met à jour l'encodage d'un étudiant"""
-        conn = sqlite3.connect(self.db_name)
-        c = conn.cursor()
-        
-        try:
-            encoding_blob = pickle.dumps(encoding)
-            c.execute('UPDATE students SET encoding = ? WHERE id = ?', 
-                     (encoding_blob, student_id))
-            conn.commit()
-            return True
-        except Exception as e:
-            print(f"   Erreur DB: {e}")
-            return False
-        finally:
-            conn.close()
+        """Met à jour l'encodage d'un étudiant (connexion WAL de AttendanceDatabase)"""
+        return self.database.update_student_encodings_batch([(student_id, encoding)], self.detector.encoding_model)
     
     def get_encoding_info(self):
         """Récupère les infos sur les encodages existants"""
-        conn = sqlite3.connect(self.db_name)
-        c = conn.cursor()
-        c.execute('SELECT id, first_name, last_name, encoding FROM students WHERE encoding IS NOT NULL')
-        results = c.fetchall()
-        conn.close()
+        results = self.database.get_stored_encodings()
         
         encodings_info = []
-        for student_id, first_name, last_name, encoding_blob in results:
+        for student_id, first_name, last_name, encoding_blob, dim in results:
             if encoding_blob:
                 try:
-                    encoding = pickle.loads(encoding_blob)
-                    encoding_array = np.array(encoding)
+                    encoding_array = blob_to_encoding(encoding_blob)
+                    if dim is None or len(encoding_array) != dim:
+                        raise ValueError("taille incohérente")
                     encodings_info.append({
                         'id': student_id,
                         'name': f"{first_name} {last_name}",
@@ -113,25 +174,9 @@ class EncodingMigrator:
                 no_photo_count += 1
                 continue
             
-            # Chemins possibles pour l'image (relatifs et absolus)
-            possible_paths = [
-                photo_path,
-                os.path.join('static', photo_path) if not photo_path.startswith('static') else photo_path,
-                os.path.join('uploads', photo_path),
-                photo_path.replace('\\', '/'),
-            ]
-            
-            image = None
-            found_path = None
-            
             # Trouver l'image
-            for path in possible_paths:
-                if os.path.exists(path):
-                    image = cv2.imread(path)
-                    if image is not None:
-                        found_path = path
-                        break
-            
+            image, found_path = find_student_photo(photo_path)
+
             if image is None:
                 print(f"✗ {student_name} (ID: {student_id}) - Image introuvable: {photo_path}")
                 fail_count += 1
@@ -238,7 +283,148 @@ class EncodingMigrator:
         print(f"✗ Échecs        : {fail_count}/{len(students)}")
         print(f"⚠ Sans photo    : {no_photo_count}/{len(students)}")
         print("\n💡 Vous pouvez maintenant utiliser le système de présence!")
-    
+
+    # === MIGRATION PARALLÈLE ET REPRISE ===
+    def _load_checkpoint(self):
+        """Point de reprise de la migration en cours pour ce modèle, ou None"""
+        try:
+            with open(self.checkpoint_path, encoding='utf-8') as f:
+                checkpoint = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return checkpoint if checkpoint.get('model') == self.detector.encoding_model else None
+
+    def _save_checkpoint(self, checkpoint):
+        tmp_path = self.checkpoint_path + f".tmp{os.getpid()}"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _start_pool(self, workers):
+        """Démarre le pool et attend que les modèles soient chargés dans les processus"""
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context('spawn'),
+                                   initializer=_init_worker)
+        for future in [pool.submit(_worker_ready) for _ in range(workers)]:
+            future.result()
+        return pool
+
+    def _pending_students(self, after_id=0):
+        """Étudiants avec photo et id > after_id, triés par id ; retourne (étudiants, nb total sans photo)"""
+        students = sorted(self.get_all_students(), key=lambda s: s['id'])
+        pending = [s for s in students if s['id'] > after_id and s['photo_path']]
+        return pending, sum(1 for s in students if not s['photo_path'])
+
+    def migrate_parallel(self, workers=None, chunk_size=16, batch_size=256, resume=True):
+        """Ré-encode tous les étudiants dans un pool de processus.
+
+        Les encodages sont écrits par transactions de `batch_size` étudiants ;
+        après chaque transaction, le dernier id traité est enregistré dans
+        le point de reprise : une migration interrompue repart de là.
+        """
+        workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        model = self.detector.encoding_model
+
+        checkpoint = self._load_checkpoint() if resume else None
+        if checkpoint:
+            print(f"\n↻ Reprise après l'étudiant {checkpoint['last_id']} "
+                  f"({checkpoint['success']} déjà migré(s), {checkpoint['failed']} échec(s))")
+        else:
+            checkpoint = {'model': model, 'last_id': 0, 'success': 0, 'failed': 0}
+
+        students, no_photo = self._pending_students(checkpoint['last_id'])
+        if no_photo:
+            print(f"⚠️ {no_photo} étudiant(s) sans chemin photo en DB")
+        if not students:
+            print("\n✓ Aucun étudiant à migrer")
+            if os.path.exists(self.checkpoint_path):
+                os.remove(self.checkpoint_path)
+            return checkpoint
+
+        print(f"\n📋 {len(students)} étudiant(s) à traiter avec {workers} processus ({model})\n")
+        names = {s['id']: s['name'] for s in students}
+        chunks = [students[i:i + chunk_size] for i in range(0, len(students), chunk_size)]
+
+        pool = self._start_pool(workers)
+        start = time.perf_counter()
+        done = 0
+        pending_updates = []
+        pending_failed = 0
+        try:
+            for chunk, results in zip(chunks, pool.map(_encode_students, chunks)):
+                for student_id, encoding, error in results:
+                    if encoding is None:
+                        print(f"✗ {names[student_id]} (ID: {student_id}) - {error}")
+                        pending_failed += 1
+                    else:
+                        pending_updates.append((student_id, encoding))
+                done += len(chunk)
+                last_id = chunk[-1]['id']
+
+                if len(pending_updates) >= batch_size or done == len(students):
+                    if pending_updates and not self.database.update_student_encodings_batch(pending_updates, model):
+                        print("✗ Erreur sauvegarde DB - relancez la migration pour reprendre")
+                        return checkpoint
+                    checkpoint['success'] += len(pending_updates)
+                    checkpoint['failed'] += pending_failed
+                    checkpoint['last_id'] = last_id
+                    pending_updates, pending_failed = [], 0
+                    self._save_checkpoint(checkpoint)
+
+                    rate = done / (time.perf_counter() - start)
+                    eta = (len(students) - done) / rate if rate else 0
+                    print(f"⏳ {done}/{len(students)} - {rate:.1f} étudiants/s - reste ~{_format_duration(eta)}")
+        except KeyboardInterrupt:
+            print(f"\n⏸ Migration interrompue après l'étudiant {checkpoint['last_id']} - relancez pour reprendre")
+            return checkpoint
+        finally:
+            pool.shutdown(cancel_futures=True)
+
+        elapsed = time.perf_counter() - start
+        os.remove(self.checkpoint_path)
+
+        print("\n" + "=" * 70)
+        print(" RÉSUMÉ DE LA MIGRATION ".center(70))
+        print("=" * 70)
+        total = checkpoint['success'] + checkpoint['failed'] + no_photo
+        print(f"✓ Succès        : {checkpoint['success']}/{total}")
+        print(f"✗ Échecs        : {checkpoint['failed']}/{total}")
+        print(f"⚠ Sans photo    : {no_photo}/{total}")
+        print(f"⏱ Durée         : {_format_duration(elapsed)} ({len(students) / elapsed:.1f} étudiants/s)")
+        return checkpoint
+
+    def estimate(self, sample=200, workers=None, chunk_size=16):
+        """Dry-run : encode un échantillon sans rien écrire, affiche le débit et la durée estimée"""
+        workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        checkpoint = self._load_checkpoint()
+        students, no_photo = self._pending_students(checkpoint['last_id'] if checkpoint else 0)
+        if not students:
+            print("\n✓ Aucun étudiant à migrer")
+            return None
+
+        # Échantillon réparti sur toute la liste (photos anciennes et récentes)
+        step = max(1, len(students) // sample)
+        sampled = students[::step][:sample]
+        chunks = [sampled[i:i + chunk_size] for i in range(0, len(sampled), chunk_size)]
+
+        print(f"\n🔍 Dry-run sur {len(sampled)} étudiant(s) avec {workers} processus (aucune écriture)...")
+        pool = self._start_pool(workers)
+        try:
+            start = time.perf_counter()
+            results = [r for chunk_results in pool.map(_encode_students, chunks) for r in chunk_results]
+            elapsed = time.perf_counter() - start
+        finally:
+            pool.shutdown()
+
+        failed = sum(1 for _, encoding, _ in results if encoding is None)
+        rate = len(sampled) / elapsed if elapsed > 0 else float('inf')
+        eta = len(students) / rate
+        print(f"\n📊 Débit          : {rate:.1f} étudiants/s")
+        print(f"   Échecs estimés : {failed / len(sampled):.0%} de l'échantillon")
+        print(f"   À migrer       : {len(students)} étudiant(s) ({no_photo} sans photo)")
+        print(f"   Durée estimée  : ~{_format_duration(eta)}")
+        return {'students_per_sec': rate, 'failed_ratio': failed / len(sampled),
+                'remaining': len(students), 'eta_seconds': eta}
+
     def verify_encodings(self):
         """Vérifie le format de tous les encodages"""
         encodings_info = self.get_encoding_info()
@@ -300,10 +486,12 @@ def main():
         print("  1. Vérifier les encodages actuels")
         print("  2. Migrer tous les encodages (mode normal)")
         print("  3. Migrer avec mode DEBUG (voir les détections)")
-        print("  4. Quitter")
+        print("  4. Migration parallèle (reprise automatique)")
+        print("  5. Estimer la durée de la migration (dry-run)")
+        print("  6. Quitter")
         print("=" * 70)
         
-        choice = input("\nVotre choix (1-4): ").strip()
+        choice = input("\nVotre choix (1-6): ").strip()
         
         if choice == '1':
             migrator.verify_encodings()
@@ -327,6 +515,18 @@ def main():
                 print("\n❌ Migration annulée")
         
         elif choice == '4':
+            confirm = input("\n⚠️ Migrer tous les encodages en parallèle? (o/n): ").lower()
+            if confirm == 'o':
+                migrator.migrate_parallel()
+                print("\n" + "=" * 70)
+                migrator.verify_encodings()
+            else:
+                print("\n❌ Migration annulée")
+        
+        elif choice == '5':
+            migrator.estimate()
+        
+        elif choice == '6':
             print("\n👋 Au revoir!")
             break
         
@@ -0,0 +1,206 @@
+"""
+Reconnaissance à la demande (POST /sessions/{id}/detect) dans un pool dédié
+
+- Des threads de reconnaissance, chacun avec son propre FaceDetector
+  (cascade et réseau OpenCV ne sont pas partagés entre threads), lisent
+  la galerie du détecteur principal : une simple référence, la galerie
+  étant remplacée par copie à chaque mise à jour.
+- OpenCV libère le GIL pendant le décodage, la détection et l'encodage ;
+  ses threads internes sont limités à cpu_count // workers pour que les
+  workers ne se disputent pas les cœurs. Ce réglage est global au
+  processus (pipeline de présence, flux WebSocket...) : passer
+  `opencv_threads=0` pour laisser celui d'OpenCV inchangé.
+- Admission bornée : au-delà de `workers + queue_size` requêtes en cours,
+  submit() refuse la requête (l'API répond 429 avec Retry-After).
+
+Chaque résultat indique l'attente en file et le temps de service.
+
+Un lot d'images (submit_batch) compte pour une seule requête : décodage et
+détection sont répartis sur les workers, puis tous les visages du lot sont
+encodés ensemble et comparés à la galerie en un seul appel ; son
+attente et son temps de service entrent dans les mêmes statistiques.
+"""
+
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from face_detector import FaceDetector
+
+
+class RecognitionPool:
+    def __init__(self, detector, detector_options=None, workers=None, queue_size=None, opencv_threads=None):
+        self.detector = detector  # détecteur principal : source de la galerie
+        self.detector_options = detector_options or {}
+        self.workers = workers or max(1, min(4, os.cpu_count() or 1))
+        self.queue_size = self.workers * 2 if queue_size is None else queue_size
+
+        # Threads internes d'OpenCV (réglage global au processus) : les cœurs sont répartis entre workers
+        if opencv_threads is None:
+            opencv_threads = max(1, (os.cpu_count() or 1) // self.workers)
+        if opencv_threads > 0:
+            cv2.setNumThreads(opencv_threads)
+
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="recognition")
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.in_flight = 0
+
+        # Coordination des lots, hors des workers (qui ne s'attendent jamais entre eux)
+        self._batch_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="recognition-batch")
+
+        self.completed = 0
+        self.rejected = 0
+        self.batches = 0
+        self.batch_images = 0
+        self._wait_ms = deque(maxlen=1000)
+        self._service_ms = deque(maxlen=1000)
+
+    # === ADMISSION ===
+    @property
+    def capacity(self):
+        return self.workers + self.queue_size
+
+    def submit(self, image_bytes):
+        """Soumet une image encodée (JPEG/PNG...), retourne un Future, ou None si le pool est saturé"""
+        with self._lock:
+            if self.in_flight >= self.capacity:
+                self.rejected += 1
+                return None
+            self.in_flight += 1
+        try:
+            return self._executor.submit(self._recognize, image_bytes, time.perf_counter())
+        except RuntimeError:
+            self._release()  # pool arrêté
+            raise
+
+    def submit_batch(self, images):
+        """Soumet un lot d'images encodées, retourne un Future, ou None si le pool est saturé"""
+        with self._lock:
+            if self.in_flight >= self.capacity:
+                self.rejected += 1
+                return None
+            self.in_flight += 1
+        try:
+            return self._batch_executor.submit(self._recognize_batch, list(images), time.perf_counter())
+        except RuntimeError:
+            self._release()
+            raise
+
+    def retry_after(self):
+        """Secondes conseillées avant de réessayer (temps pour vider la file actuelle)"""
+        with self._lock:
+            samples = list(self._service_ms)
+        service_s = np.mean(samples) / 1000 if samples else 1.0
+        return max(1, math.ceil(service_s * self.in_flight / self.workers))
+
+    def _release(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    # === WORKERS ===
+    def _worker_detector(self):
+        detector = getattr(self._local, "detector", None)
+        if detector is None:
+            detector = FaceDetector(**self.detector_options)
+            detector.use_ann = False  # recherche exacte (BLAS) sur la galerie partagée
+            self._local.detector = detector
+        detector.gallery = self.detector.gallery
+        detector.tolerance = self.detector.tolerance
+        return detector
+
+    def _recognize(self, image_bytes, enqueued_at):
+        started_at = time.perf_counter()
+        try:
+            frame = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+            faces = None
+            if frame is not None:
+                faces = self._worker_detector().detect_faces_in_frame(frame, return_all_faces=True)
+        finally:
+            self._release()
+
+        finished_at = time.perf_counter()
+        wait_ms = (started_at - enqueued_at) * 1000
+        service_ms = (finished_at - started_at) * 1000
+        with self._lock:
+            self.completed += 1
+            self._wait_ms.append(wait_ms)
+            self._service_ms.append(service_ms)
+        return {"faces": faces, "queue_wait_ms": round(wait_ms, 2), "service_ms": round(service_ms, 2)}
+
+    def _decode_and_detect(self, image_bytes):
+        frame = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+        if frame is None:
+            return None, []
+        return frame, self._worker_detector()._detect_boxes(frame)
+
+    def _recognize_batch(self, images, enqueued_at):
+        started_at = time.perf_counter()
+        try:
+            # Décodage et détection en parallèle sur les workers
+            decoded = list(self._executor.map(self._decode_and_detect, images))
+
+            # Encodage de tous les visages du lot, puis une seule recherche dans la galerie
+            detector = self._worker_detector()
+            crops, boxes = [], []
+            for frame, frame_boxes in decoded:
+                for (x, y, w, h) in frame_boxes:
+                    crops.append(frame[y:y + h, x:x + w])
+                    boxes.append((x, y, w, h))
+            encodings = detector._extract_face_encodings(crops) if crops else []
+            matched = detector._match_encodings(boxes, encodings, return_all_faces=True) if boxes else []
+
+            faces, offset = [], 0
+            for frame, frame_boxes in decoded:
+                faces.append(None if frame is None else matched[offset:offset + len(frame_boxes)])
+                offset += len(frame_boxes)
+        finally:
+            self._release()
+
+        finished_at = time.perf_counter()
+        wait_ms = (started_at - enqueued_at) * 1000
+        service_ms = (finished_at - started_at) * 1000
+        with self._lock:
+            self.batches += 1
+            self.batch_images += len(images)
+            self._wait_ms.append(wait_ms)
+            self._service_ms.append(service_ms)
+        return {
+            "faces": faces,
+            "encoded_faces": len(crops),
+            "queue_wait_ms": round(wait_ms, 2),
+            "service_ms": round(service_ms, 2),
+        }
+
+    def shutdown(self):
+        self._batch_executor.shutdown(wait=True, cancel_futures=True)
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    # === STATISTIQUES ===
+    def stats(self):
+        def percentiles(samples):
+            if not samples:
+                return {"p50": 0.0, "p99": 0.0}
+            p50, p99 = np.percentile(samples, [50, 99])
+            return {"p50": round(float(p50), 2), "p99": round(float(p99), 2)}
+
+        with self._lock:
+            wait_ms, service_ms = list(self._wait_ms), list(self._service_ms)
+        return {
+            "workers": self.workers,
+            "opencv_threads": cv2.getNumThreads(),
+            "capacity": self.capacity,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "batches": self.batches,
+            "batch_images": self.batch_images,
+            "queue_wait_ms": percentiles(wait_ms),
+            "service_ms": percentiles(service_ms),
+        }
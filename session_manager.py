@@ -0,0 +1,321 @@
+"""
+Gestionnaire de sessions multi-caméras
+
+Chaque caméra tourne dans son propre processus (pas de GIL partagé) avec
+un pipeline de présence sans affichage. La galerie d'encodages est publiée
+une seule fois en mémoire partagée et attachée sans copie par tous les
+processus.
+
+Avec recognition_workers > 1, la caméra est lue par un processus de
+capture qui écrit dans un anneau d'images partagé (frame_bus), et
+plusieurs processus de reconnaissance se répartissent les images.
+
+Les processus remontent périodiquement leurs statistiques (débit par
+étape, présences marquées) au processus principal. Avec un `event_bus`,
+leurs présences sont aussi relayées sur le bus du processus principal
+(flux SSE de l'API).
+"""
+
+import atexit
+import math
+import multiprocessing as mp
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+def parse_video_source(source):
+    """'0' → 0 (index de périphérique), sinon chemin de fichier ou URL"""
+    if isinstance(source, str) and source.strip().isdigit():
+        return int(source.strip())
+    return source
+
+
+def ring_slots(camera_fps, recognition_latency_s, recognition_workers):
+    """Taille de l'anneau : images écrites pendant une reconnaissance, plus une par lecteur
+
+    Un lecteur qui termine une reconnaissance prend la dernière image ; elle ne
+    doit pas être écrasée avant qu'il l'ait copiée, même si tous les lecteurs
+    repassent en même temps.
+    """
+    return max(4, math.ceil(camera_fps * recognition_latency_s) + recognition_workers)
+
+
+class SharedGallery:
+    """Matrice de la galerie copiée une fois dans un bloc de mémoire partagée"""
+
+    def __init__(self, gallery):
+        matrix = np.ascontiguousarray(gallery.matrix, dtype=np.float32)
+        self.shape = matrix.shape
+        self.students = list(gallery.students)
+        self.shm = shared_memory.SharedMemory(create=True, size=max(1, matrix.nbytes))
+        np.ndarray(self.shape, dtype=np.float32, buffer=self.shm.buf)[:] = matrix
+
+    def descriptor(self):
+        return {"name": self.shm.name, "shape": self.shape, "students": self.students}
+
+    def release(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+def attach_gallery(detector, descriptor):
+    """Attache la galerie partagée au détecteur d'un processus (sans copie)"""
+    shm = shared_memory.SharedMemory(name=descriptor["name"])
+    matrix = np.ndarray(descriptor["shape"], dtype=np.float32, buffer=shm.buf)
+    detector.gallery.set_matrix(matrix, descriptor["students"])
+    detector._ann_dirty = True
+    return shm
+
+
+def _recognition_worker(worker_id, role, session_id, source, db_name, gallery_desc, detector_options,
+                        stop_event, status_queue, report_every, ring_name=None, partition=None, event_queue=None):
+    """Point d'entrée d'un processus de reconnaissance (caméra directe ou anneau partagé)"""
+    from attendance_pipeline import AttendancePipeline
+    from database import AttendanceDatabase
+    from event_bus import QueueEventPublisher
+    from face_detector import FaceDetector
+    from frame_bus import RingFrameSource, SharedFrameRing
+
+    detector = FaceDetector(**detector_options)
+    shm = attach_gallery(detector, gallery_desc)
+    database = AttendanceDatabase(db_name)
+    ring = SharedFrameRing(ring_name) if ring_name else None
+    frame_source = RingFrameSource(ring, partition) if ring else None
+    recorder_options = {"event_bus": QueueEventPublisher(event_queue)} if event_queue is not None else None
+    pipeline = AttendancePipeline(detector, database, session_id, source=source, display=False,
+                                  frame_source=frame_source, recorder_options=recorder_options)
+
+    def report(state):
+        status_queue.put((worker_id, role, state, {
+            "marked_count": len(detector.marked_students),
+            "pipeline": pipeline.stats(),
+        }))
+
+    def watch():
+        # Scrutation plutôt que stop_event.wait() : un processus qui se termine pendant
+        # un wait() bloquerait le set() du processus principal
+        last_report = time.monotonic()
+        while detector.running and not stop_event.is_set():
+            time.sleep(0.1)
+            if time.monotonic() - last_report >= report_every:
+                report("running")
+                last_report = time.monotonic()
+        detector.running = False
+
+    detector.running = True
+    watcher = threading.Thread(target=watch, daemon=True)
+    watcher.start()
+    try:
+        ok = pipeline.run()
+        detector.running = False
+        watcher.join()
+        report("stopped" if ok else "error")
+    finally:
+        detector.gallery.__init__()  # libère la vue avant de fermer le bloc partagé
+        shm.close()
+        if ring is not None:
+            ring.release()
+
+
+def _capture_worker(worker_id, source, ring_name, stop_event, status_queue, report_every):
+    """Point d'entrée du processus de capture : caméra → anneau d'images partagé"""
+    import cv2
+
+    from attendance_pipeline import StageStats
+    from frame_bus import SharedFrameRing
+
+    ring = SharedFrameRing(ring_name)
+    stats = StageStats("capture")
+    cap = cv2.VideoCapture(source)
+    state = "stopped"
+    if not cap.isOpened():
+        print("✗ Webcam inaccessible")
+        state = "error"
+
+    last_report = time.monotonic()
+    try:
+        while state != "error" and not stop_event.is_set():
+            ret, frame = cap.read()
+            if not ret:
+                print("✗ Erreur lecture webcam")
+                break
+            ring.write(frame)
+            stats.tick()
+            if time.monotonic() - last_report >= report_every:
+                status_queue.put((worker_id, "capture", "running", {"pipeline": {"capture": stats.as_dict()}}))
+                last_report = time.monotonic()
+    finally:
+        ring.close()
+        cap.release()
+        status_queue.put((worker_id, "capture", state, {"pipeline": {"capture": stats.as_dict()}}))
+        ring.release()
+
+
+class SessionManager:
+    def __init__(self, db_name, detector_options=None, start_method="spawn", report_every=1.0,
+                 max_frame_shape=(1080, 1920, 3), event_bus=None, camera_fps=30, recognition_latency_s=0.25):
+        self.db_name = db_name
+        self.detector_options = detector_options or {}
+        self.report_every = report_every
+        self.max_frame_shape = max_frame_shape
+        self.camera_fps = camera_fps
+        self.recognition_latency_s = recognition_latency_s  # détection + encodage d'une image
+        self._ctx = mp.get_context(start_method)
+        self._status_queue = self._ctx.Queue()
+        self._workers = {}
+        self._next_id = 1
+        self._gallery = None
+        self._gallery_source = None
+        self._lock = threading.Lock()
+
+        self._event_queue = None
+        self._forwarder = None
+        if event_bus is not None:
+            self._event_queue = self._ctx.Queue()
+            self._forwarder = threading.Thread(target=event_bus.forward, args=(self._event_queue,),
+                                               daemon=True, name="camera-events")
+            self._forwarder.start()
+        atexit.register(self.stop_all)
+
+    def _shared_gallery(self, gallery):
+        """Publie la galerie en mémoire partagée si elle a changé depuis la dernière fois"""
+        if self._gallery is None or self._gallery_source is not gallery.matrix:
+            previous = self._gallery
+            self._gallery = SharedGallery(gallery)
+            self._gallery_source = gallery.matrix
+            if previous is not None and not any(w["gallery"] is previous for w in self._workers.values()):
+                previous.release()
+        return self._gallery
+
+    def start(self, session_id, source, gallery, recognition_workers=1):
+        """Lance la reconnaissance pour une caméra, retourne son identifiant"""
+        from frame_bus import SharedFrameRing
+
+        with self._lock:
+            shared = self._shared_gallery(gallery)
+            worker_id = self._next_id
+            self._next_id += 1
+            source_value = parse_video_source(source)
+            stop_event = self._ctx.Event()
+            common = (session_id, source_value, self.db_name, shared.descriptor(), self.detector_options,
+                      stop_event, self._status_queue, self.report_every)
+
+            events = {"event_queue": self._event_queue}
+            ring = None
+            processes = {}
+            if recognition_workers <= 1:
+                processes["camera"] = self._ctx.Process(
+                    target=_recognition_worker, args=(worker_id, "camera") + common, kwargs=events,
+                    daemon=True, name=f"camera-{worker_id}",
+                )
+            else:
+                slots = ring_slots(self.camera_fps, self.recognition_latency_s, recognition_workers)
+                ring = SharedFrameRing(slots=slots, max_shape=self.max_frame_shape)
+                processes["capture"] = self._ctx.Process(
+                    target=_capture_worker,
+                    args=(worker_id, source_value, ring.name, stop_event, self._status_queue, self.report_every),
+                    daemon=True, name=f"capture-{worker_id}",
+                )
+                for k in range(recognition_workers):
+                    role = f"recognition-{k}"
+                    processes[role] = self._ctx.Process(
+                        target=_recognition_worker,
+                        args=(worker_id, role) + common + (ring.name, (k, recognition_workers)),
+                        kwargs=events, daemon=True, name=f"{role}-{worker_id}",
+                    )
+
+            for process in processes.values():
+                process.start()
+            self._workers[worker_id] = {
+                "session_id": session_id,
+                "source": source,
+                "processes": processes,
+                "stop_event": stop_event,
+                "gallery": shared,
+                "ring": ring,
+                "started_at": time.time(),
+                "states": {role: "starting" for role in processes},
+                "stats": {},
+            }
+            return worker_id
+
+    def _drain_status(self):
+        while True:
+            try:
+                worker_id, role, state, stats = self._status_queue.get_nowait()
+            except queue.Empty:
+                return
+            worker = self._workers.get(worker_id)
+            if worker is not None:
+                worker["states"][role] = state
+                worker["stats"][role] = stats
+
+    def stop(self, worker_id, timeout=10):
+        """Arrête les processus d'une caméra et retourne leurs dernières statistiques"""
+        with self._lock:
+            worker = self._workers.get(worker_id)
+            if worker is None:
+                return None
+            worker["stop_event"].set()
+            for process in worker["processes"].values():
+                process.join(timeout)
+                if process.is_alive():
+                    process.terminate()
+            self._drain_status()
+            status = self._status(worker_id, worker)
+            del self._workers[worker_id]
+
+            if worker["ring"] is not None:
+                worker["ring"].release()
+            shared = worker["gallery"]
+            if shared is not self._gallery and not any(w["gallery"] is shared for w in self._workers.values()):
+                shared.release()
+            return status
+
+    def stop_all(self):
+        for worker_id in list(self._workers):
+            self.stop(worker_id)
+        if self._gallery is not None:
+            self._gallery.release()
+            self._gallery = self._gallery_source = None
+        if self._forwarder is not None:
+            self._event_queue.put(None)
+            self._forwarder.join(timeout=5)
+            self._forwarder = None
+
+    def _status(self, worker_id, worker):
+        processes = {}
+        for role, process in worker["processes"].items():
+            state = worker["states"][role]
+            if not process.is_alive() and state in ("starting", "running"):
+                state = "exited"
+            processes[role] = {"pid": process.pid, "state": state, **worker["stats"].get(role, {})}
+
+        states = {p["state"] for p in processes.values()}
+        recognition = [p["pipeline"]["recognition"] for p in processes.values()
+                       if "recognition" in p.get("pipeline", {})]
+        return {
+            "worker_id": worker_id,
+            "session_id": worker["session_id"],
+            "source": worker["source"],
+            "state": "running" if "running" in states else states.pop() if len(states) == 1 else "partial",
+            "uptime_s": round(time.time() - worker["started_at"], 1),
+            "recognition_fps": round(sum(r["fps"] for r in recognition), 1),
+            "processes": processes,
+        }
+
+    def status(self, worker_id=None, session_id=None):
+        """État et débit des processus caméra (tous, un seul, ou ceux d'une séance)"""
+        with self._lock:
+            self._drain_status()
+            if worker_id is not None:
+                worker = self._workers.get(worker_id)
+                return None if worker is None else self._status(worker_id, worker)
+            return [
+                self._status(wid, w) for wid, w in self._workers.items()
+                if session_id is None or w["session_id"] == session_id
+            ]